@@ -1,5 +1,9 @@
 from django.contrib import admin
 from django.utils import timezone
+
+from exam_site import entitlements
+
+from . import stats
 from .models import BlogCategory, BlogPost, PostPurchase
 
 
@@ -13,7 +17,7 @@ class BlogCategoryAdmin(admin.ModelAdmin):
 
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
-    list_display = ("title", "category", "is_paid", "is_published", "featured_post", "view_count", "created_at")
+    list_display = ("title", "category", "is_paid", "is_published", "featured_post", "view_count", "unique_readers", "created_at")
     search_fields = ("title", "summary", "content")
     list_filter = ("category", "is_paid", "is_published", "featured_post")
     prepopulated_fields = {"slug": ("title",)}
@@ -21,12 +25,19 @@ class BlogPostAdmin(admin.ModelAdmin):
 
 @admin.action(description="Approve selected purchases")
 def approve_purchases(modeladmin, request, queryset):
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(status=PostPurchase.APPROVED, approved_by=request.user, approved_date=timezone.now())
+    # Only once updated: outside a transaction the caches are cleared at once
+    entitlements.invalidate(user_ids)
+    stats.invalidate()
 
 
 @admin.action(description="Reject selected purchases")
 def reject_purchases(modeladmin, request, queryset):
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(status=PostPurchase.REJECTED, approved_by=request.user, approved_date=timezone.now())
+    entitlements.invalidate(user_ids)
+    stats.invalidate()
 
 
 @admin.register(PostPurchase)
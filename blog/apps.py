@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blog"
+
+    def ready(self):
+        # Register signals (search index, entitlement and stats caches, shared media files)
+        from . import signals  # noqa: F401
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from blog.related import compute_related_posts
+
+
+class Command(BaseCommand):
+    help = "Store the related articles of new and edited blog posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every post, not only new and edited ones.",
+        )
+
+    def handle(self, *args, **options):
+        count = compute_related_posts(full=options["all"])
+        self.stdout.write(f"Updated related articles of {count} post(s).")
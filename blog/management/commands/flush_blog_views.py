@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import view_tracking
+
+
+class Command(BaseCommand):
+    help = "Add buffered article views and readers to the blog posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and flush every N seconds (0 = flush once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            written = view_tracking.flush_views()
+            self.stdout.write(f"Flushed {written} view(s).")
+
+            if interval <= 0:
+                break
+            time.sleep(interval)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import BlogPost
+from blog.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the blog articles."
+
+    def handle(self, *args, **options):
+        count = rebuild_index(BlogPost.objects.all())
+        self.stdout.write(f"Indexed {count} article(s).")
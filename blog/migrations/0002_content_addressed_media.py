@@ -0,0 +1,19 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:09
+
+import exam_site.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blogpost',
+            name='featured_image',
+            field=models.ImageField(blank=True, null=True, storage=exam_site.storage.media_storage, upload_to='blog/images/'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.10 on 2026-10-19 11:20
+
+from django.db import migrations
+
+from blog.search import index_document, post_index
+
+
+def create_search_index(apps, schema_editor):
+    post_index.create(schema_editor)
+
+    alias = schema_editor.connection.alias
+    if not post_index.supported(alias):
+        return
+
+    BlogPost = apps.get_model("blog", "BlogPost")
+    for post in BlogPost.objects.using(alias).iterator():
+        post_index.update(post.pk, index_document(post), using=alias)
+
+
+def drop_search_index(apps, schema_editor):
+    post_index.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_blogpost_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='reader_sketch',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='unique_readers',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
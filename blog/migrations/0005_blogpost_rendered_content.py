@@ -0,0 +1,56 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:17
+
+from django.db import migrations, models
+
+from blog.rendering import preview, reading_minutes, render_content
+
+
+def render_posts(apps, schema_editor):
+    BlogPost = apps.get_model("blog", "BlogPost")
+    alias = schema_editor.connection.alias
+    for post in BlogPost.objects.using(alias).only("pk", "content").iterator():
+        rendered = render_content(post.content)
+        word_count = len(rendered.text.split())
+        BlogPost.objects.using(alias).filter(pk=post.pk).update(
+            content_html=rendered.html,
+            preview_text=preview(rendered.text),
+            word_count=word_count,
+            reading_minutes=reading_minutes(word_count),
+            toc=rendered.headings,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_blogpost_unique_readers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='preview_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='reading_minutes',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='toc',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_posts, migrations.RunPython.noop),
+    ]
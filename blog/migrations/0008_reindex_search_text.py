@@ -0,0 +1,27 @@
+# Generated by Django 5.0.10 on 2026-10-19 14:05
+
+from django.db import migrations
+
+from blog.search import index_document, post_index
+
+
+def reindex_posts(apps, schema_editor):
+    # Earlier index rows ran words together at block tag boundaries
+    alias = schema_editor.connection.alias
+    if not post_index.supported(alias):
+        return
+
+    BlogPost = apps.get_model("blog", "BlogPost")
+    for post in BlogPost.objects.using(alias).iterator():
+        post_index.update(post.pk, index_document(post), using=alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blogpost_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_posts, migrations.RunPython.noop),
+    ]
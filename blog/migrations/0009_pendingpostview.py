@@ -0,0 +1,23 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_reindex_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingPostView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reader', models.CharField(max_length=64)),
+                ('viewed_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.blogpost')),
+            ],
+        ),
+    ]
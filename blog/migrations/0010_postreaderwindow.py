@@ -0,0 +1,30 @@
+# Generated by Django 5.0.10 on 2026-10-19 08:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_pendingpostview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostReaderWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reader', models.CharField(max_length=64)),
+                ('window', models.PositiveBigIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.blogpost')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window'], name='postreaderwindow_window_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postreaderwindow',
+            constraint=models.UniqueConstraint(fields=('post', 'reader', 'window'), name='unique_post_reader_window'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
-import html
-from django.utils.html import strip_tags
-from django.utils.text import slugify
+from exam_site.slugs import save_with_unique_slug
+from exam_site.storage import media_storage
+
+from .rendering import preview, reading_minutes, render_content
 
 
 class BlogCategory(models.Model):
@@ -22,15 +23,12 @@ class BlogCategory(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.name) or "category"
-            slug = base
-            counter = 2
-            while BlogCategory.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self,
+            self.name,
+            lambda: super(BlogCategory, self).save(*args, **kwargs),
+            fallback="category",
+        )
 
 
 class BlogPost(models.Model):
@@ -39,7 +37,7 @@ class BlogPost(models.Model):
     slug = models.SlugField(max_length=240, unique=True, blank=True)
     summary = models.TextField(blank=True)
     content = models.TextField()
-    featured_image = models.ImageField(upload_to="blog/images/", blank=True, null=True)
+    featured_image = models.ImageField(upload_to="blog/images/", storage=media_storage, blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_paid = models.BooleanField(default=False)
     is_published = models.BooleanField(default=True)
@@ -51,39 +49,122 @@ class BlogPost(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     view_count = models.PositiveIntegerField(default=0)
 
+    # Approximate distinct readers, from a HyperLogLog sketch (blog/view_tracking.py)
+    unique_readers = models.PositiveIntegerField(default=0, editable=False)
+    reader_sketch = models.BinaryField(default=b"", editable=False)
+
+    # Computed from `content` on save (blog/rendering.py)
+    content_html = models.TextField(blank=True, editable=False)
+    preview_text = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_minutes = models.PositiveSmallIntegerField(default=0, editable=False)
+    toc = models.JSONField(default=list, blank=True, editable=False)
+
+    RENDERED_FIELDS = ("content_html", "preview_text", "word_count", "reading_minutes", "toc")
+
+    # Last run of `compute_related_posts` that covered this post
+    related_computed_at = models.DateTimeField(blank=True, null=True, editable=False)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination of the blog list (blog/pagination.py)
+            models.Index(fields=["-created_at", "-id"], name="blogpost_latest_idx"),
+            models.Index(fields=["-view_count", "-created_at", "-id"], name="blogpost_most_viewed_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.title) or "post"
-            slug = base
-            counter = 2
-            while BlogPost.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                slug = f"{base}-{counter}"
-                counter += 1
-            self.slug = slug
-        if not self.summary and self.content:
-            clean = html.unescape(" ".join(strip_tags(self.content).replace("\xa0", " ").split()))
-            self.summary = clean[:250]
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "content" in update_fields:
+            text = self.render()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *self.RENDERED_FIELDS}
+        else:
+            text = self.preview_text
+        if not self.summary and text:
+            self.summary = text[:250]
         if not self.seo_title:
             self.seo_title = self.title
         if not self.seo_description:
             self.seo_description = self.summary[:160]
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self,
+            self.title,
+            lambda: super(BlogPost, self).save(*args, **kwargs),
+            fallback="post",
+        )
+
+    def render(self):
+        """
+        Fill the rendered fields from `content`. Returns the plain text.
+        """
+        rendered = render_content(self.content)
+        self.content_html = rendered.html
+        self.preview_text = preview(rendered.text)
+        self.word_count = len(rendered.text.split())
+        self.reading_minutes = reading_minutes(self.word_count)
+        self.toc = rendered.headings
+        return rendered.text
+
+    def premium_preview(self):
+        """Clean text-only preview for users without premium access."""
+        return self.preview_text
+
+
+class RelatedPost(models.Model):
+    """
+    Precomputed content recommendation: `related` is the rank-th most
+    similar published post to `post` (blog/related.py).
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name="related_links")
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name="related_to_links")
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
 
+    class Meta:
+        ordering = ["post", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["post", "related"], name="unique_related_post")
+        ]
+
+    def __str__(self):
+        return f"{self.post} -> {self.related}"
 
 
-    def premium_preview(self, length=450):
-        """Return a clean text-only preview for users without premium access."""
-        clean = html.unescape(strip_tags(self.content or "").replace("\xa0", " "))
-        clean = " ".join(clean.split())
-        if len(clean) <= length:
-            return clean
-        return clean[:length].rsplit(" ", 1)[0] + "..."
+class PendingPostView(models.Model):
+    """
+    A counted article view not yet added to its post (blog/view_tracking.py).
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name="+")
+    # Hashed reader identity, merged into the post's reader sketch
+    reader = models.CharField(max_length=64)
+    viewed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.post_id} @ {self.viewed_at}"
+
+
+class PostReaderWindow(models.Model):
+    """
+    A reader already counted for a post in one dedupe window
+    (blog/view_tracking.py). Only the current window's rows are kept.
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name="+")
+    reader = models.CharField(max_length=64)
+    # Number of BLOG_VIEW_DEDUPE_SECONDS periods since the epoch
+    window = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "reader", "window"], name="unique_post_reader_window")
+        ]
+        indexes = [models.Index(fields=["window"], name="postreaderwindow_window_idx")]
+
+    def __str__(self):
+        return f"{self.post_id} / {self.reader} / {self.window}"
 
 
 class PostPurchase(models.Model):
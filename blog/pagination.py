@@ -0,0 +1,139 @@
+"""
+Keyset (cursor) pagination for the blog list.
+
+The latest and most-viewed orderings end with the primary key, so each page
+is fetched with a WHERE on the sort key of the last (or first) row of the
+previous page instead of an OFFSET: page 200 costs the same as page 1.
+
+Cursors are signed, so a tampered cursor just shows the first page. The
+total number of pages comes from a cached count (blog/stats.py); other
+orderings use Django's Paginator with the same cached count.
+"""
+from datetime import datetime
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+# Sort fields, all descending
+KEYSET_ORDERINGS = {
+    "latest": ("created_at", "id"),
+    "most_viewed": ("view_count", "created_at", "id"),
+}
+
+CURSOR_SALT = "blog.pagination"
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator that takes its count from the caller instead of a COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__["count"] = count
+
+
+class KeysetPage:
+    def __init__(self, object_list, number, num_pages, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.number = number
+        self.num_pages = max(num_pages, number)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return bool(self.next_cursor)
+
+    @property
+    def has_previous(self):
+        return bool(self.previous_cursor)
+
+
+def _encode(values, number):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return signing.dumps({"v": values, "n": number}, salt=CURSOR_SALT, compress=True)
+
+
+def _decode(cursor, fields):
+    if not cursor:
+        return None
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        values = [
+            datetime.fromisoformat(value) if field == "created_at" else int(value)
+            for field, value in zip(fields, data["v"], strict=True)
+        ]
+        return values, int(data["n"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def _beyond(fields, values, after):
+    """
+    Rows after (or before) `values` in descending (fields) order:
+    a < x OR (a = x AND b < y) OR ...
+    """
+    lookup = "lt" if after else "gt"
+    condition = Q()
+    for position, field in enumerate(fields):
+        step = Q(**{f"{field}__{lookup}": values[position]})
+        for previous_field, value in zip(fields[:position], values):
+            step &= Q(**{previous_field: value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, sort, after, before, per_page, count):
+    """
+    One page of `queryset` in the `sort` ordering, following the `after`
+    or `before` cursor (first page without one).
+    """
+    fields = KEYSET_ORDERINGS[sort]
+    descending = [f"-{field}" for field in fields]
+    num_pages = max(1, -(-count // per_page))
+
+    cursor = _decode(after, fields)
+    forward = True
+    if cursor is None:
+        cursor = _decode(before, fields)
+        forward = cursor is None
+
+    if cursor is None:
+        number = 1
+        rows = list(queryset.order_by(*descending)[:per_page + 1])
+        has_next, has_previous = len(rows) > per_page, False
+        rows = rows[:per_page]
+    elif forward:
+        values, number = cursor
+        rows = list(
+            queryset.filter(_beyond(fields, values, after=True))
+            .order_by(*descending)[:per_page + 1]
+        )
+        has_next, has_previous = len(rows) > per_page, True
+        rows = rows[:per_page]
+    else:
+        values, number = cursor
+        rows = list(
+            queryset.filter(_beyond(fields, values, after=False))
+            .order_by(*fields)[:per_page + 1]
+        )
+        has_next, has_previous = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        if not has_previous:
+            number = 1
+
+    if not rows:
+        return KeysetPage([], 1, num_pages, "", "")
+
+    def key(row):
+        return [getattr(row, field) for field in fields]
+
+    return KeysetPage(
+        rows,
+        number,
+        num_pages,
+        _encode(key(rows[-1]), number + 1) if has_next else "",
+        _encode(key(rows[0]), number - 1) if has_previous else "",
+    )
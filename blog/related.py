@@ -0,0 +1,172 @@
+"""
+Related articles by content similarity.
+
+Every post is turned into a TF-IDF vector over its title, summary and
+tag-stripped content (sublinear term frequency, L2-normalized, the
+MAX_TERMS strongest terms kept; terms found in more than MAX_DOCUMENT_SHARE
+of the posts carry no signal and are dropped). Cosine similarities are sums
+over an inverted index, so only posts sharing a term are ever compared.
+
+The top BLOG_RELATED_POSTS published posts are stored as RelatedPost rows
+by `python manage.py compute_related_posts`. A run recomputes posts that are
+new or were edited since their last run, plus the posts whose list they now
+belong in; `--all` recomputes every post (also refreshing the IDF weights).
+"""
+import heapq
+import html
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BlogPost, RelatedPost
+
+TAG_RE = re.compile(r"<[^>]*>")
+WORD_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+MAX_TERMS = 50
+MAX_DOCUMENT_SHARE = 0.5
+
+
+def related_count():
+    return getattr(settings, "BLOG_RELATED_POSTS", 4)
+
+
+def _terms(post):
+    # A regex is enough to drop tags for counting words, and much faster
+    # than strip_tags() over the whole corpus.
+    content = html.unescape(TAG_RE.sub(" ", post.content or ""))
+    text = " ".join([post.title, post.title, post.summary, content])
+    return Counter(WORD_RE.findall(text.lower()))
+
+
+def build_vectors(posts):
+    """
+    {pk: {term: weight}} for `posts` (an iterable of BlogPost).
+    """
+    counts = {post.pk: _terms(post) for post in posts}
+    documents = len(counts)
+
+    frequency = Counter()
+    for terms in counts.values():
+        frequency.update(terms.keys())
+
+    common = max(2, documents * MAX_DOCUMENT_SHARE)
+    idf = {
+        term: math.log(documents / df)
+        for term, df in frequency.items()
+        if df <= common
+    }
+
+    vectors = {}
+    for pk, terms in counts.items():
+        weights = {
+            term: (1 + math.log(count)) * idf[term]
+            for term, count in terms.items()
+            if term in idf
+        }
+        strongest = heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1])
+        norm = math.sqrt(sum(weight * weight for _term, weight in strongest))
+        vectors[pk] = {term: weight / norm for term, weight in strongest if weight} if norm else {}
+    return vectors
+
+
+class SimilarityIndex:
+    def __init__(self, vectors, candidate_ids):
+        self.vectors = vectors
+        self.postings = defaultdict(list)
+        for pk in candidate_ids:
+            for term, weight in vectors.get(pk, {}).items():
+                self.postings[term].append((pk, weight))
+
+    def scores(self, pk):
+        """
+        {candidate pk: cosine similarity} of the candidates sharing a term
+        with `pk`.
+        """
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings.get(term, ()):
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        return scores
+
+    def top(self, pk, count):
+        scores = self.scores(pk)
+        return heapq.nsmallest(count, scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _save_lists(lists, computed_at):
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(lists)).delete()
+        RelatedPost.objects.bulk_create(
+            [
+                RelatedPost(post_id=pk, related_id=other, rank=rank, score=score)
+                for pk, top in lists.items()
+                for rank, (other, score) in enumerate(top, 1)
+            ],
+            batch_size=1000,
+        )
+        BlogPost.objects.filter(pk__in=list(lists)).update(related_computed_at=computed_at)
+
+
+def compute_related_posts(full=False):
+    """
+    Store the related posts of new and edited posts (all posts with
+    `full`). Returns the number of posts whose list was written.
+    """
+    computed_at = timezone.now()
+    count = related_count()
+
+    posts = list(
+        BlogPost.objects.only(
+            "pk", "title", "summary", "content", "is_published",
+            "updated_at", "related_computed_at",
+        )
+    )
+    if full:
+        changed = {post.pk for post in posts}
+    else:
+        changed = {
+            post.pk for post in posts
+            if post.related_computed_at is None or post.updated_at > post.related_computed_at
+        }
+    if not changed:
+        return 0
+
+    vectors = build_vectors(posts)
+    index = SimilarityIndex(vectors, [post.pk for post in posts if post.is_published])
+
+    targets = set(changed)
+    if not full:
+        targets |= _affected_lists(vectors, posts, changed, count)
+
+    _save_lists({pk: index.top(pk, count) for pk in targets}, computed_at)
+    return len(targets)
+
+
+def _affected_lists(vectors, posts, changed, count):
+    """
+    Other posts whose list may change: those listing a changed post, and
+    those where a changed published post now beats the weakest entry.
+    """
+    affected = set(
+        RelatedPost.objects.filter(related_id__in=changed).values_list("post_id", flat=True)
+    )
+
+    # Posts with a shorter list have no weakest entry: any match gets in
+    weakest = dict(
+        RelatedPost.objects.filter(rank=count).values_list("post_id", "score")
+    )
+    # Similarity is symmetric: score each changed post against every post
+    everyone = SimilarityIndex(vectors, [post.pk for post in posts])
+    published = {post.pk for post in posts if post.is_published}
+
+    for pk in changed & published:
+        for other, score in everyone.scores(pk).items():
+            if score > weakest.get(other, 0.0):
+                affected.add(other)
+    return affected - changed
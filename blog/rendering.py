@@ -0,0 +1,230 @@
+"""
+Article content pipeline, run once when a post is saved.
+
+render_content() turns the CKEditor HTML into:
+
+- html:      sanitized HTML (allow-listed tags and attributes, safe URLs),
+             with an id on every h2-h4 heading
+- text:      the readable text, whitespace-normalized
+- headings:  table of contents, [{"level", "id", "title"}, ...]
+
+BlogPost.save() stores these with the preview text, word count and reading
+time, so the detail page only prints stored values.
+"""
+import html
+import math
+import re
+from html.parser import HTMLParser
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.text import slugify
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "caption", "code", "col", "colgroup", "div",
+    "em", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+    "i", "img", "li", "ol", "p", "pre", "s", "span", "strong", "sub", "sup",
+    "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+
+VOID_TAGS = {"br", "col", "hr", "img"}
+
+# Dropped together with everything inside them
+DROPPED_TAGS = {"script", "style", "iframe", "object", "noscript", "template", "svg", "math"}
+
+ALLOWED_ATTRIBUTES = {
+    "*": {"class", "style", "title"},
+    "a": {"href", "target", "rel"},
+    "img": {"src", "alt", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan", "scope"},
+    "ol": {"start", "type"},
+}
+
+URL_ATTRIBUTES = {"href", "src"}
+SAFE_URL_RE = re.compile(r"^(https?:|mailto:|/|#|\.|[^:/?#]+(?:[/?#]|$))", re.I)
+UNSAFE_STYLE_RE = re.compile(r"url\s*\(|expression|javascript:|behavior|@import", re.I)
+
+TOC_TAGS = {"h2": 2, "h3": 3, "h4": 4}
+
+BLOCK_TAGS = {
+    "blockquote", "br", "div", "figcaption", "h1", "h2", "h3", "h4", "h5",
+    "h6", "hr", "li", "p", "pre", "td", "th", "tr",
+}
+
+
+class RenderedContent(NamedTuple):
+    html: str
+    text: str
+    headings: list
+
+
+def _safe_url(value):
+    value = value.strip()
+    # Browsers ignore control characters and spaces inside the scheme
+    compact = re.sub(r"[\x00-\x20]+", "", value)
+    return value if SAFE_URL_RE.match(compact) else None
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.output = []
+        self.text = []
+        self.headings = []
+        self.open_tags = []
+        self.dropped_depth = 0
+        self.heading = None
+        self.heading_ids = set()
+
+    # ------------------------------------------------------
+
+    def _attributes(self, tag, attrs):
+        allowed = ALLOWED_ATTRIBUTES["*"] | ALLOWED_ATTRIBUTES.get(tag, set())
+        result = []
+        for name, value in attrs:
+            name = name.lower()
+            value = value or ""
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            if name == "style" and UNSAFE_STYLE_RE.search(value):
+                continue
+            result.append((name, value))
+
+        if tag == "a" and any(name == "target" for name, _value in result):
+            result = [(n, v) for n, v in result if n != "rel"]
+            result.append(("rel", "noopener noreferrer"))
+        return result
+
+    def _heading_id(self, title):
+        base = slugify(title) or "section"
+        heading_id = base
+        counter = 2
+        while heading_id in self.heading_ids:
+            heading_id = f"{base}-{counter}"
+            counter += 1
+        self.heading_ids.add(heading_id)
+        return heading_id
+
+    def _write_start(self, tag, attrs):
+        rendered = "".join(
+            f' {name}="{html.escape(value, quote=True)}"' for name, value in attrs
+        )
+        self.output.append(f"<{tag}{rendered}>")
+
+    # ------------------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropped_depth += 1
+            return
+        if self.dropped_depth:
+            return
+
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+            if self.heading is not None:
+                self.heading["parts"].append(" ")
+        if tag not in ALLOWED_TAGS:
+            return
+
+        attrs = [(n, v) for n, v in self._attributes(tag, attrs) if n != "id"]
+
+        if tag in TOC_TAGS and self.heading is None:
+            # The id is only known once the heading text has been read
+            self.heading = {"tag": tag, "attrs": attrs, "start": len(self.output), "parts": []}
+            self.output.append("")
+            self.open_tags.append(tag)
+            return
+
+        self._write_start(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and tag in ALLOWED_TAGS and not self.dropped_depth:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped_depth = max(0, self.dropped_depth - 1)
+            return
+        if self.dropped_depth or tag not in self.open_tags:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(" ")
+
+        # Close anything left open inside this element
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f"</{open_tag}>")
+            if self.heading is not None and open_tag == self.heading["tag"]:
+                self._finish_heading()
+            if open_tag == tag:
+                break
+
+    def _finish_heading(self):
+        heading = self.heading
+        self.heading = None
+        title = " ".join("".join(heading["parts"]).split())
+        heading_id = self._heading_id(title)
+
+        start = [("id", heading_id), *heading["attrs"]]
+        rendered = "".join(
+            f' {name}="{html.escape(value, quote=True)}"' for name, value in start
+        )
+        self.output[heading["start"]] = f"<{heading['tag']}{rendered}>"
+        if title:
+            self.headings.append({
+                "level": TOC_TAGS[heading["tag"]],
+                "id": heading_id,
+                "title": title,
+            })
+
+    def handle_data(self, data):
+        if self.dropped_depth:
+            return
+        self.output.append(html.escape(data, quote=False))
+        self.text.append(data)
+        if self.heading is not None:
+            self.heading["parts"].append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            tag = self.open_tags.pop()
+            self.output.append(f"</{tag}>")
+            if self.heading is not None and tag == self.heading["tag"]:
+                self._finish_heading()
+
+
+def render_content(raw_html):
+    renderer = _Renderer()
+    renderer.feed(raw_html or "")
+    renderer.close()
+
+    text = " ".join("".join(renderer.text).replace("\xa0", " ").split())
+    return RenderedContent(
+        html="".join(renderer.output),
+        text=text,
+        headings=renderer.headings,
+    )
+
+
+def preview(text, length=450):
+    """Plain-text preview, cut at a word boundary."""
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "..."
+
+
+def reading_minutes(word_count):
+    words_per_minute = getattr(settings, "BLOG_READING_WORDS_PER_MINUTE", 200)
+    return max(1, math.ceil(word_count / words_per_minute)) if word_count else 0
@@ -0,0 +1,88 @@
+"""
+Article search: full-text index over the post title, summary and the
+tag-stripped content (see exam_site.fulltext).
+"""
+from django.db.models import Q
+
+from exam_site.fulltext import SearchIndex
+
+from .rendering import render_content
+
+post_index = SearchIndex(
+    "blog_blogpost_fts",
+    (("title", "A"), ("summary", "B"), ("content", "C")),
+)
+
+
+def plain_text(value):
+    """
+    CKEditor HTML -> text, as read on the page: the same text the post's
+    reading metadata is computed from, with blocks and <br> kept apart.
+    """
+    return render_content(value).text
+
+
+def index_document(post):
+    return {
+        "title": post.title,
+        "summary": post.summary,
+        "content": plain_text(post.content),
+    }
+
+
+def index_post(post, using="default"):
+    if post_index.supported(using):
+        post_index.update(post.pk, index_document(post), using=using)
+
+
+def remove_post(pk, using="default"):
+    post_index.remove(pk, using=using)
+
+
+def rebuild_index(posts, using="default"):
+    if not post_index.supported(using):
+        return 0
+
+    post_index.clear(using=using)
+    count = 0
+    for post in posts.iterator():
+        post_index.update(post.pk, index_document(post), using=using)
+        count += 1
+    return count
+
+
+def search_posts(queryset, q):
+    """
+    Posts of `queryset` matching `q`, most relevant first.
+    """
+    if post_index.supported(queryset.db):
+        return post_index.filter(queryset, q)
+
+    return queryset.filter(
+        Q(title__icontains=q)
+        | Q(summary__icontains=q)
+        | Q(content__icontains=q)
+    )
+
+
+def add_snippets(posts, q, readable_ids, using="default"):
+    """
+    Set `search_snippet` (highlighted excerpt, or "" when only the title
+    matched) on each post.
+    Premium posts the reader has not bought are quoted from their summary
+    only, never from the content.
+    """
+    for post in posts:
+        post.search_snippet = ""
+    if not post_index.supported(using):
+        return
+
+    content = {p.pk: plain_text(p.content) for p in posts if p.pk in readable_ids}
+    summary = {p.pk: p.summary for p in posts if p.pk not in readable_ids}
+    snippets = {
+        **post_index.highlight(q, content, "content", using=using),
+        **post_index.highlight(q, summary, "summary", using=using),
+    }
+    for post in posts:
+        snippet = snippets.get(post.pk, "")
+        post.search_snippet = snippet if "<mark>" in snippet else ""
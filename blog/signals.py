@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from exam_site import entitlements
+from exam_site.storage import connect_reference_counting
+
+from . import stats
+from .models import BlogCategory, BlogPost, PostPurchase
+from .search import index_post, remove_post
+
+# Featured images are shared between posts with the same upload
+connect_reference_counting(BlogPost)
+
+
+@receiver(post_save, sender=BlogPost)
+def update_post_search_index(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        index_post(instance, using=using)
+
+
+@receiver(post_delete, sender=BlogPost)
+def remove_post_search_index(sender, instance, using, **kwargs):
+    remove_post(instance.pk, using=using)
+
+
+@receiver(post_save, sender=PostPurchase)
+@receiver(post_delete, sender=PostPurchase)
+def invalidate_post_entitlements(sender, instance, **kwargs):
+    entitlements.invalidate([instance.user_id])
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+@receiver(post_save, sender=PostPurchase)
+@receiver(post_delete, sender=PostPurchase)
+def invalidate_blog_stats(sender, **kwargs):
+    stats.invalidate()
@@ -0,0 +1,113 @@
+"""
+Cached numbers for the blog list page.
+
+The staff counters are computed with one conditional aggregate per table
+(posts, categories, purchases) and, like the featured articles and the
+result counts of each filter combination, kept in the BLOG_STATS_CACHE
+cache for BLOG_STATS_CACHE_TIMEOUT seconds.
+
+Post, category and purchase saves and deletes call invalidate() through
+signals; queryset.update() callers (admin bulk actions) call it themselves.
+View counts shown with the featured articles may lag by up to the timeout.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import BlogCategory, BlogPost, PostPurchase
+
+STAFF_STATS_KEY = "blog:staff-stats"
+FEATURED_POSTS_KEY = "blog:featured-posts"
+
+# Result counts are keyed under a generation that invalidate() replaces,
+# since there is one key per filter combination.
+COUNT_GENERATION_KEY = "blog:count-generation"
+
+
+def _cache():
+    return caches[getattr(settings, "BLOG_STATS_CACHE", "default")]
+
+
+def _timeout():
+    return getattr(settings, "BLOG_STATS_CACHE_TIMEOUT", 5 * 60)
+
+
+def _load_staff_stats():
+    stats = BlogPost.objects.aggregate(
+        total=Count("pk"),
+        published=Count("pk", filter=Q(is_published=True)),
+        draft=Count("pk", filter=Q(is_published=False)),
+        premium=Count("pk", filter=Q(is_paid=True)),
+        free=Count("pk", filter=Q(is_paid=False)),
+    )
+    stats.update(BlogCategory.objects.aggregate(categories=Count("pk")))
+    stats.update(
+        PostPurchase.objects.aggregate(
+            pending=Count("pk", filter=Q(status=PostPurchase.PENDING)),
+            approved=Count("pk", filter=Q(status=PostPurchase.APPROVED)),
+        )
+    )
+    return stats
+
+
+def staff_stats():
+    """
+    Post, category and purchase counters shown to staff.
+    """
+    cache = _cache()
+    stats = cache.get(STAFF_STATS_KEY)
+    if stats is None:
+        stats = _load_staff_stats()
+        cache.set(STAFF_STATS_KEY, stats, _timeout())
+    return stats
+
+
+def featured_posts(limit=3):
+    cache = _cache()
+    posts = cache.get(FEATURED_POSTS_KEY)
+    if posts is None:
+        posts = list(
+            BlogPost.objects.filter(is_published=True, featured_post=True)
+            .select_related("category")[:limit]
+        )
+        cache.set(FEATURED_POSTS_KEY, posts, _timeout())
+    return posts
+
+
+def _count_generation(cache):
+    cache.add(COUNT_GENERATION_KEY, uuid.uuid4().hex, None)
+    return cache.get(COUNT_GENERATION_KEY, "")
+
+
+def post_count(queryset, filters):
+    """
+    Number of posts in `queryset`, cached per `filters` (a JSON-serialisable
+    description of how the queryset was filtered).
+    """
+    cache = _cache()
+    digest = hashlib.md5(
+        json.dumps(filters, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    key = f"blog:post-count:{_count_generation(cache)}:{digest}"
+
+    count = cache.get(key)
+    if count is None:
+        count = queryset.order_by().count()
+        cache.set(key, count, _timeout())
+    return count
+
+
+def invalidate():
+    """
+    Drop the cached numbers once the current transaction commits.
+    """
+    transaction.on_commit(
+        lambda: _cache().delete_many(
+            [STAFF_STATS_KEY, FEATURED_POSTS_KEY, COUNT_GENERATION_KEY]
+        )
+    )
@@ -1,12 +1,17 @@
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import Count, Q
+from django.db.models import Count
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from exam_site import entitlements
+
+from . import pagination, search
+from . import stats as blog_stats
+from . import view_tracking
 from .forms import BlogCategoryForm, BlogPostForm, PostPurchaseForm
 from .models import BlogCategory, BlogPost, PostPurchase
 
@@ -26,7 +31,20 @@ def user_has_access(user, post):
         return False
     if user.is_staff:
         return True
-    return PostPurchase.objects.filter(user=user, post=post, status=PostPurchase.APPROVED).exists()
+    return post.pk in entitlements.for_user(user).post_ids
+
+
+POSTS_PER_PAGE = 8
+
+
+def _page_query(request, **params):
+    """Current query string with the page / cursor replaced by `params`."""
+    query = request.GET.copy()
+    for name in ("page", "after", "before"):
+        query.pop(name, None)
+    for name, value in params.items():
+        query[name] = value
+    return query.urlencode()
 
 
 def blog_list(request):
@@ -36,46 +54,76 @@ def blog_list(request):
 
     q = request.GET.get("q", "").strip()
     category_slug = request.GET.get("category", "").strip()
-    sort = request.GET.get("sort", "latest")
+    sort = request.GET.get("sort") or ("relevance" if q else "latest")
 
-    if q:
-        posts = posts.filter(Q(title__icontains=q) | Q(summary__icontains=q) | Q(content__icontains=q))
     if category_slug:
         posts = posts.filter(category__slug=category_slug)
+    if q:
+        # Ranked by relevance unless another order is picked
+        posts = search.search_posts(posts, q)
     if sort == "most_viewed":
         posts = posts.order_by("-view_count", "-created_at")
     elif sort == "featured":
         posts = posts.order_by("-featured_post", "-created_at")
-    else:
+    elif sort != "relevance" or not q:
         posts = posts.order_by("-created_at")
 
     categories = BlogCategory.objects.filter(active=True).order_by("name")
-    featured_posts = BlogPost.objects.filter(is_published=True, featured_post=True).select_related("category")[:3]
-    most_viewed_posts = BlogPost.objects.filter(is_published=True).order_by("-view_count")[:3]
 
     stats = None
     if request.user.is_staff:
-        stats = {
-            "total": BlogPost.objects.count(),
-            "published": BlogPost.objects.filter(is_published=True).count(),
-            "draft": BlogPost.objects.filter(is_published=False).count(),
-            "premium": BlogPost.objects.filter(is_paid=True).count(),
-            "free": BlogPost.objects.filter(is_paid=False).count(),
-            "categories": BlogCategory.objects.count(),
-            "pending": PostPurchase.objects.filter(status=PostPurchase.PENDING).count(),
-            "approved": PostPurchase.objects.filter(status=PostPurchase.APPROVED).count(),
-        }
-
-    from django.core.paginator import Paginator
-    paginator = Paginator(posts, 8)
-    page_obj = paginator.get_page(request.GET.get("page"))
+        stats = blog_stats.staff_stats()
+
+    count = blog_stats.post_count(posts, {
+        "staff": request.user.is_staff,
+        "category": category_slug,
+        "q": q,
+    })
+
+    if sort in pagination.KEYSET_ORDERINGS:
+        page_obj = pagination.keyset_page(
+            posts,
+            sort,
+            request.GET.get("after"),
+            request.GET.get("before"),
+            POSTS_PER_PAGE,
+            count,
+        )
+        next_query = previous_query = ""
+        if page_obj.has_next:
+            next_query = _page_query(request, after=page_obj.next_cursor)
+        if page_obj.has_previous:
+            previous_query = _page_query(request, before=page_obj.previous_cursor)
+        num_pages = page_obj.num_pages
+    else:
+        # Relevance and featured orderings keep numbered pages
+        paginator = pagination.CachedCountPaginator(posts, POSTS_PER_PAGE, count)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        next_query = previous_query = ""
+        if page_obj.has_next():
+            next_query = _page_query(request, page=page_obj.next_page_number())
+        if page_obj.has_previous():
+            previous_query = _page_query(request, page=page_obj.previous_page_number())
+        num_pages = paginator.num_pages
+
+    if q:
+        page_obj.object_list = list(page_obj.object_list)
+        search.add_snippets(
+            page_obj.object_list,
+            q,
+            {post.pk for post in page_obj.object_list if user_has_access(request.user, post)},
+            using=posts.db,
+        )
 
     return render(request, "blog/post_list.html", {
         "page_obj": page_obj,
+        "num_pages": num_pages,
+        "next_query": next_query,
+        "previous_query": previous_query,
         "categories": categories,
-        "featured_posts": featured_posts,
-        "most_viewed_posts": most_viewed_posts,
+        "featured_posts": blog_stats.featured_posts(),
         "stats": stats,
+        "owned_post_ids": entitlements.for_user(request.user).post_ids,
         "q": q,
         "selected_category": category_slug,
         "sort": sort,
@@ -88,18 +136,25 @@ def post_detail(request, slug):
         post_qs = post_qs.filter(is_published=True, category__active=True)
     post = get_object_or_404(post_qs, slug=slug)
 
-    BlogPost.objects.filter(pk=post.pk).update(view_count=post.view_count + 1)
-    post.view_count += 1
+    # Counts on the page include views up to the last flush_blog_views run
+    view_tracking.record_view(request, post)
 
     purchase = None
     access = user_has_access(request.user, post)
     if request.user.is_authenticated:
         purchase = PostPurchase.objects.filter(user=request.user, post=post).first()
 
+    # Precomputed by `compute_related_posts`; newest in the category until then
     related_posts = BlogPost.objects.filter(
-        category=post.category,
+        related_to_links__post=post,
         is_published=True,
-    ).exclude(pk=post.pk).order_by("-created_at")[:4]
+        category__active=True,
+    ).select_related("category").order_by("related_to_links__rank")[:4]
+    if post.related_computed_at is None:
+        related_posts = BlogPost.objects.filter(
+            category=post.category,
+            is_published=True,
+        ).exclude(pk=post.pk).select_related("category").order_by("-created_at")[:4]
 
     return render(request, "blog/post_detail.html", {
         "post": post,
@@ -0,0 +1,88 @@
+"""
+Per-user entitlements: the paid videos and articles a user has bought.
+
+The approved purchase ids are loaded with one query per purchase table, kept
+in the ENTITLEMENT_CACHE cache and memoised on the user object, so access
+checks on listing and detail pages are set lookups.
+
+Anything that changes a purchase status must call invalidate(): model saves
+and deletes do so through signals; queryset.update() callers (admin bulk
+actions) call it themselves.
+"""
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class Entitlements(NamedTuple):
+    video_ids: frozenset
+    post_ids: frozenset
+
+
+NO_ENTITLEMENTS = Entitlements(frozenset(), frozenset())
+
+
+def _cache():
+    return caches[getattr(settings, "ENTITLEMENT_CACHE", "default")]
+
+
+def _timeout():
+    return getattr(settings, "ENTITLEMENT_CACHE_TIMEOUT", 60 * 60)
+
+
+def _key(user_id):
+    return f"entitlements:{user_id}"
+
+
+def _load(user_id):
+    VideoPurchase = apps.get_model("videos", "VideoPurchase")
+    PostPurchase = apps.get_model("blog", "PostPurchase")
+
+    return Entitlements(
+        video_ids=frozenset(
+            VideoPurchase.objects.filter(
+                user_id=user_id,
+                status=VideoPurchase.Status.APPROVED,
+            ).values_list("video_id", flat=True)
+        ),
+        post_ids=frozenset(
+            PostPurchase.objects.filter(
+                user_id=user_id,
+                status=PostPurchase.APPROVED,
+            ).values_list("post_id", flat=True)
+        ),
+    )
+
+
+def for_user(user):
+    """
+    Entitlements of `user` (empty for anonymous users).
+    """
+    if not getattr(user, "is_authenticated", False):
+        return NO_ENTITLEMENTS
+
+    entitlements = getattr(user, "_entitlements", None)
+    if entitlements is not None:
+        return entitlements
+
+    cache = _cache()
+    entitlements = cache.get(_key(user.pk))
+    if entitlements is None:
+        entitlements = _load(user.pk)
+        cache.set(_key(user.pk), entitlements, _timeout())
+
+    user._entitlements = entitlements
+    return entitlements
+
+
+def invalidate(user_ids):
+    """
+    Forget the cached entitlements of these users once the current
+    transaction commits.
+    """
+    keys = [_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: _cache().delete_many(keys))
@@ -0,0 +1,264 @@
+"""
+Full-text search indexes shared by the apps.
+
+Each index is a side table next to the model table, created by a migration
+and kept up to date from post_save / post_delete signals:
+
+- SQLite:     an FTS5 virtual table, ranked with bm25()
+- PostgreSQL: a table with a weighted tsvector column and a GIN index,
+              ranked with ts_rank()
+
+On other database backends `supported()` is False and callers fall back to
+their old `icontains` filters.
+
+highlight() returns HTML-escaped excerpts with the matched words wrapped in
+<mark> (FTS5 snippet() / PostgreSQL ts_headline()).
+"""
+import re
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Case, FloatField, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Private-use characters marking matches in excerpts until the text has
+# been escaped; they are removed from indexed text.
+MARK_START = "\ue000"
+MARK_END = "\ue001"
+SNIPPET_WORDS = 32
+
+# Relative column weights: PostgreSQL setweight() labels and FTS5 bm25() weights
+PG_WEIGHTS = {"A": 10.0, "B": 5.0, "C": 2.0, "D": 1.0}
+
+
+def search_config():
+    return getattr(settings, "FULLTEXT_SEARCH_CONFIG", "simple")
+
+
+class SearchIndex:
+    """
+    `columns` is a sequence of (name, weight) with weight "A" (most
+    important) to "D".
+    """
+
+    def __init__(self, table, columns, limit=1000):
+        self.table = table
+        self.columns = tuple(columns)
+        self.limit = limit
+
+    def _connection(self, using):
+        return connections[using]
+
+    def supported(self, using="default"):
+        return self._connection(using).vendor in {"sqlite", "postgresql"}
+
+    # ------------------------------------------------------
+    # Schema (called from migrations)
+    # ------------------------------------------------------
+
+    def create(self, schema_editor):
+        vendor = schema_editor.connection.vendor
+        names = ", ".join(name for name, _weight in self.columns)
+
+        if vendor == "sqlite":
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5({names}, tokenize='unicode61 remove_diacritics 2')"
+            )
+        elif vendor == "postgresql":
+            schema_editor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                f"(id bigint PRIMARY KEY, document tsvector NOT NULL)"
+            )
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document_gin "
+                f"ON {self.table} USING GIN (document)"
+            )
+
+    def drop(self, schema_editor):
+        if schema_editor.connection.vendor in {"sqlite", "postgresql"}:
+            schema_editor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    # ------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------
+
+    def update(self, pk, values, using="default"):
+        """
+        Index (or re-index) one row. `values` maps column name to text.
+        """
+        connection = self._connection(using)
+        texts = [_clean(values.get(name)) for name, _weight in self.columns]
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [pk])
+                placeholders = ", ".join(["%s"] * (len(texts) + 1))
+                names = ", ".join(name for name, _weight in self.columns)
+                cursor.execute(
+                    f"INSERT INTO {self.table} (rowid, {names}) VALUES ({placeholders})",
+                    [pk, *texts],
+                )
+            elif connection.vendor == "postgresql":
+                document = " || ".join(
+                    f"setweight(to_tsvector(%s::regconfig, %s), '{weight}')"
+                    for _name, weight in self.columns
+                )
+                params = []
+                for text in texts:
+                    params += [search_config(), text]
+                cursor.execute(
+                    f"INSERT INTO {self.table} (id, document) VALUES (%s, {document}) "
+                    f"ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document",
+                    [pk, *params],
+                )
+
+    def remove(self, pk, using="default"):
+        connection = self._connection(using)
+        if connection.vendor not in {"sqlite", "postgresql"}:
+            return
+
+        key = "rowid" if connection.vendor == "sqlite" else "id"
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE {key} = %s", [pk])
+
+    def clear(self, using="default"):
+        if self.supported(using):
+            with self._connection(using).cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table}")
+
+    # ------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------
+
+    def _fts5_query(self, query):
+        # Every word must match, as a prefix; quoting keeps user input
+        # from being read as FTS5 syntax.
+        words = WORD_RE.findall(query)
+        return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+    def search(self, query, using="default", within=None):
+        """
+        Return [(pk, rank), ...] best match first, at most `limit` rows.
+        With `within` (a queryset of the indexed model) only its rows are
+        ranked, so the limit applies after the caller's filters.
+        """
+        connection = self._connection(using)
+
+        within_sql, within_params = None, []
+        if within is not None:
+            try:
+                within_sql, within_params = (
+                    within.order_by().values("pk").query.get_compiler(using).as_sql()
+                )
+            except EmptyResultSet:
+                return []
+
+        def restrict(column):
+            return f" AND {column} IN ({within_sql})" if within_sql else ""
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                match = self._fts5_query(query)
+                if not match:
+                    return []
+                weights = ", ".join(str(PG_WEIGHTS[weight]) for _name, weight in self.columns)
+                cursor.execute(
+                    f"SELECT rowid, -bm25({self.table}, {weights}) AS rank "
+                    f"FROM {self.table} WHERE {self.table} MATCH %s"
+                    f"{restrict('rowid')} ORDER BY rank DESC LIMIT %s",
+                    [match, *within_params, self.limit],
+                )
+            elif connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SELECT id, ts_rank(document, query) AS rank "
+                    f"FROM {self.table}, websearch_to_tsquery(%s::regconfig, %s) query "
+                    f"WHERE document @@ query{restrict('id')} "
+                    f"ORDER BY rank DESC LIMIT %s",
+                    [search_config(), query, *within_params, self.limit],
+                )
+            else:
+                return []
+
+            return cursor.fetchall()
+
+    def highlight(self, query, documents, column, using="default"):
+        """
+        Excerpts of `column` around the matches of `query`, as
+        {pk: safe HTML}. `documents` maps pk to the column text (the
+        PostgreSQL index keeps no text of its own).
+        """
+        connection = self._connection(using)
+        if not documents:
+            return {}
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                match = self._fts5_query(query)
+                if not match:
+                    return {}
+                names = [name for name, _weight in self.columns]
+                pks = list(documents)
+                cursor.execute(
+                    f"SELECT rowid, snippet({self.table}, %s, %s, %s, %s, %s) "
+                    f"FROM {self.table} WHERE {self.table} MATCH %s "
+                    f"AND rowid IN ({', '.join(['%s'] * len(pks))})",
+                    [names.index(column), MARK_START, MARK_END, "…", SNIPPET_WORDS, match, *pks],
+                )
+            elif connection.vendor == "postgresql":
+                rows = ", ".join(["(%s::bigint, %s::text)"] * len(documents))
+                params = []
+                for pk, text in documents.items():
+                    params += [pk, _clean(text)]
+                options = (
+                    f'StartSel="{MARK_START}", StopSel="{MARK_END}", '
+                    f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}, '
+                    f'MaxFragments=2, FragmentDelimiter=" … "'
+                )
+                cursor.execute(
+                    f"SELECT docs.id, ts_headline(%s::regconfig, docs.body, query, %s) "
+                    f"FROM (VALUES {rows}) AS docs(id, body), "
+                    f"websearch_to_tsquery(%s::regconfig, %s) query",
+                    [search_config(), options, *params, search_config(), query],
+                )
+            else:
+                return {}
+
+            return {pk: _marked_html(excerpt) for pk, excerpt in cursor.fetchall()}
+
+    def filter(self, queryset, query):
+        """
+        Restrict `queryset` to matches of `query`, ordered by relevance
+        (annotated as `search_rank`). Filters applied before are part of
+        the full-text query; filters applied after only see the best
+        `limit` matches.
+        """
+        ranks = self.search(query, using=queryset.db, within=queryset)
+        if not ranks:
+            return queryset.none()
+
+        return queryset.filter(
+            pk__in=[pk for pk, _rank in ranks]
+        ).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(float(rank))) for pk, rank in ranks],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        ).order_by("-search_rank")
+
+
+def _clean(text):
+    return (text or "").replace(MARK_START, "").replace(MARK_END, "")
+
+
+def _marked_html(excerpt):
+    return mark_safe(
+        escape(excerpt or "")
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
@@ -207,6 +207,212 @@ else:
     }
 
 
+# ==========================================================
+# CACHES
+# ==========================================================
+#
+# "shared" is visible to every gunicorn worker; use it for anything
+# that one worker invalidates and another reads (e.g. entitlements).
+# It is a best-effort store: entries can be culled at any time once it
+# holds MAX_ENTRIES (a tenth of them at random), and its incr() is not
+# atomic. Only keep values there that can be recomputed; nothing whose
+# correctness depends on a key surviving (counters, locks, dedupe markers).
+#
+# "answers" holds write-behind exam answers. It must be shared by all
+# gunicorn workers and survive a worker crash, so it lives on disk.
+# Culling is effectively disabled: buffered answers must never be evicted.
+#
+# ==========================================================
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "SHARED_CACHE_DIR",
+            str(BASE_DIR / "cache" / "shared"),
+        ),
+        # One entitlement entry per active user plus the blog stats keys;
+        # Django's default of 300 entries would evict them constantly.
+        "OPTIONS": {
+            "MAX_ENTRIES": 100_000,
+            "CULL_FREQUENCY": 10,
+        },
+    },
+    "answers": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get(
+            "ANSWER_CACHE_DIR",
+            str(BASE_DIR / "cache" / "answers"),
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": 10_000_000,
+        },
+    },
+}
+
+
+# Approved purchase ids per user (exam_site/entitlements.py)
+ENTITLEMENT_CACHE = "shared"
+ENTITLEMENT_CACHE_TIMEOUT = 60 * 60
+
+# Staff counters and featured articles on the blog list (blog/stats.py)
+BLOG_STATS_CACHE = "shared"
+BLOG_STATS_CACHE_TIMEOUT = 5 * 60
+
+# Related articles stored per post by `manage.py compute_related_posts`
+BLOG_RELATED_POSTS = 4
+
+
+# ==========================================================
+# EXAM ANSWERS (WRITE-BEHIND)
+# ==========================================================
+#
+# EXAM_ANSWER_WRITE_BEHIND=True buffers answer edits in the "answers"
+# cache and writes them in batches (on navigation, on submit and via
+# `python manage.py flush_answer_buffer --interval 30`).
+#
+# ==========================================================
+
+EXAM_ANSWER_WRITE_BEHIND = os.environ.get(
+    "EXAM_ANSWER_WRITE_BEHIND",
+    "False",
+).lower() == "true"
+
+EXAM_ANSWER_BUFFER_CACHE = "answers"
+
+# Buffered answers are kept at most this long (seconds).
+EXAM_ANSWER_BUFFER_TIMEOUT = 7 * 24 * 60 * 60
+
+
+# ==========================================================
+# EXAM ADMISSION QUEUE
+# ==========================================================
+#
+# Maximum number of new exam attempts started per second, per exam.
+# Extra students wait on a queue page. 0 disables the queue.
+# Slots are counted in the database (exams.AdmissionCounter).
+#
+# ==========================================================
+
+EXAM_ADMISSION_RATE = float(os.environ.get("EXAM_ADMISSION_RATE", "0"))
+
+
+# ==========================================================
+# FULL-TEXT SEARCH
+# ==========================================================
+#
+# Catalog search uses FTS5 on SQLite and tsvector + GIN on
+# PostgreSQL (see exam_site/fulltext.py). After bulk imports
+# or raw SQL edits rebuild the index:
+#
+#   python manage.py rebuild_video_search_index
+#
+# ==========================================================
+
+# PostgreSQL text search configuration. "simple" does no
+# stemming, which suits the mix of Somali and English content.
+FULLTEXT_SEARCH_CONFIG = os.environ.get("FULLTEXT_SEARCH_CONFIG", "simple")
+
+
+# ==========================================================
+# VIDEO PROCESSING
+# ==========================================================
+#
+# Uploads are processed by a separate worker service:
+#
+#   python manage.py process_videos
+#
+# ==========================================================
+
+FFMPEG_BINARY = os.environ.get("FFMPEG_BINARY", "/usr/bin/ffmpeg")
+
+# Reads duration, resolution, codecs and bitrate of uploads.
+FFPROBE_BINARY = os.environ.get("FFPROBE_BINARY", "/usr/bin/ffprobe")
+
+# "mp4": one web-optimized MP4 per video.
+# "hls": additionally build an adaptive-bitrate HLS ladder next to the file.
+VIDEO_STREAMING_FORMAT = os.environ.get("VIDEO_STREAMING_FORMAT", "mp4")
+
+# HLS renditions; those taller than the source are skipped.
+VIDEO_HLS_RENDITIONS = [
+    {"height": 240, "video_bitrate": "400k", "audio_bitrate": "64k"},
+    {"height": 480, "video_bitrate": "1000k", "audio_bitrate": "96k"},
+    {"height": 720, "video_bitrate": "2500k", "audio_bitrate": "128k"},
+    {"height": 1080, "video_bitrate": "5000k", "audio_bitrate": "128k"},
+]
+
+VIDEO_HLS_SEGMENT_SECONDS = 6
+
+# Widths of the resized thumbnails (WebP + JPEG) used in srcset.
+VIDEO_THUMBNAIL_WIDTHS = [320, 640, 960]
+
+# Seek-preview storyboard: one tile every N seconds (0 = off), tiled
+# COLUMNS x ROWS per JPEG sprite sheet.
+VIDEO_STORYBOARD_INTERVAL = 10
+VIDEO_STORYBOARD_TILE_WIDTH = 160
+VIDEO_STORYBOARD_COLUMNS = 10
+VIDEO_STORYBOARD_ROWS = 10
+
+# Failed videos are retried this many times before being marked failed.
+VIDEO_PROCESSING_MAX_ATTEMPTS = 3
+
+# Seconds to wait before retrying a failed video.
+VIDEO_PROCESSING_RETRY_DELAY = 5 * 60
+
+# A video stuck in "processing" longer than this (seconds) is re-queued.
+VIDEO_PROCESSING_TIMEOUT = 6 * 60 * 60
+
+# Resumable uploads from the video form: chunks are appended to a file
+# in VIDEO_UPLOAD_DIR (keep it on the same disk as MEDIA_ROOT so the
+# finished file is moved, not copied). The front proxy must accept
+# request bodies of VIDEO_UPLOAD_CHUNK_SIZE (nginx client_max_body_size).
+VIDEO_UPLOAD_DIR = os.environ.get(
+    "VIDEO_UPLOAD_DIR",
+    str(BASE_DIR / "uploads" / "partial"),
+)
+VIDEO_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+VIDEO_UPLOAD_MAX_BYTES = int(os.environ.get("VIDEO_UPLOAD_MAX_BYTES", str(20 * 1024 ** 3)))
+
+# Unfinished uploads untouched for this long are deleted by
+# `manage.py purge_video_uploads`.
+VIDEO_UPLOAD_EXPIRY_HOURS = 48
+
+
+# ==========================================================
+# VIDEO VIEW COUNTING
+# ==========================================================
+#
+# Plays are buffered in each web worker and written in batches
+# (bulk insert + one counter update per video). View counts may
+# lag by up to VIDEO_VIEW_FLUSH_SECONDS.
+#
+# ==========================================================
+
+VIDEO_VIEW_BUFFER_SIZE = int(os.environ.get("VIDEO_VIEW_BUFFER_SIZE", "100"))
+
+VIDEO_VIEW_FLUSH_SECONDS = int(os.environ.get("VIDEO_VIEW_FLUSH_SECONDS", "30"))
+
+# Raw VideoView rows older than this many days are deleted by
+# `manage.py rollup_video_views` once summarised (0 = keep all).
+VIDEO_VIEW_RETENTION_DAYS = int(os.environ.get("VIDEO_VIEW_RETENTION_DAYS", "90"))
+
+
+# ==========================================================
+# BLOG VIEW COUNTS
+# ==========================================================
+#
+# Article views are counted once per reader and window (remembered in
+# PostReaderWindow rows), stored as PendingPostView rows and added to the
+# posts by `python manage.py flush_blog_views` (blog/view_tracking.py).
+#
+# ==========================================================
+
+BLOG_VIEW_DEDUPE_SECONDS = int(os.environ.get("BLOG_VIEW_DEDUPE_SECONDS", str(30 * 60)))
+
+
 # ==========================================================
 # PASSWORD VALIDATION
 # ==========================================================
@@ -312,6 +518,26 @@ MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
 
+# ==========================================================
+# PROTECTED MEDIA (VIDEOS)
+# ==========================================================
+#
+# Video files are sent by /videos/<slug>/stream/ after an access check.
+#
+#   MEDIA_SENDFILE_BACKEND=nginx   -> X-Accel-Redirect to MEDIA_SENDFILE_PREFIX
+#   MEDIA_SENDFILE_BACKEND=apache  -> X-Sendfile
+#   (empty)                        -> Django serves byte ranges itself
+#
+# ==========================================================
+
+MEDIA_SENDFILE_BACKEND = os.environ.get("MEDIA_SENDFILE_BACKEND", "")
+
+MEDIA_SENDFILE_PREFIX = "/protected-media/"
+
+# Largest byte range Django returns in one response (Django backend only).
+MEDIA_RANGE_MAX_BYTES = 8 * 1024 * 1024
+
+
 # ==========================================================
 # CKEDITOR 5
 # ==========================================================
@@ -0,0 +1,71 @@
+"""
+Unique slugs for models with a unique `slug` field.
+
+The free slug is found with one prefix query: every existing "<base>" and
+"<base>-N" is fetched and the first unused suffix is taken. Two concurrent
+saves can still pick the same slug, so the save runs in a savepoint and is
+retried with a fresh slug when the unique constraint rejects it.
+"""
+import re
+
+from django.db import IntegrityError, router, transaction
+from django.utils.text import slugify
+
+SAVE_ATTEMPTS = 5
+
+
+def allocate_slug(instance, value, fallback, field="slug"):
+    """
+    First free slug for `instance` derived from `value`.
+    """
+    model = type(instance)
+    max_length = model._meta.get_field(field).max_length
+    base = (slugify(value) or fallback)[:max_length].strip("-") or fallback
+
+    while True:
+        taken = set(
+            model._default_manager.filter(**{f"{field}__startswith": base})
+            .exclude(pk=instance.pk)
+            .values_list(field, flat=True)
+        )
+        if base not in taken:
+            return base
+
+        pattern = re.compile(rf"^{re.escape(base)}-(\d+)$")
+        used = {int(match.group(1)) for match in map(pattern.match, taken) if match}
+        counter = 2
+        while counter in used:
+            counter += 1
+
+        suffix = f"-{counter}"
+        if len(base) + len(suffix) <= max_length:
+            return base + suffix
+
+        # No room for the suffix: shorten the base and look again
+        base = base[:max_length - len(suffix)].rstrip("-") or fallback
+
+
+def save_with_unique_slug(instance, value, save, fallback, field="slug"):
+    """
+    Run `save()` (the model's own save), first filling a blank slug from
+    `value`. Retries with the next free slug if a concurrent save took it.
+    """
+    if getattr(instance, field):
+        return save()
+
+    model = type(instance)
+    for attempt in range(SAVE_ATTEMPTS):
+        slug = allocate_slug(instance, value, fallback, field=field)
+        setattr(instance, field, slug)
+        try:
+            with transaction.atomic(using=router.db_for_write(model, instance=instance)):
+                return save()
+        except IntegrityError:
+            lost_race = (
+                model._default_manager.filter(**{field: slug})
+                .exclude(pk=instance.pk)
+                .exists()
+            )
+            setattr(instance, field, "")
+            if not lost_race or attempt == SAVE_ATTEMPTS - 1:
+                raise
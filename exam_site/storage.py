@@ -0,0 +1,220 @@
+"""
+Content-addressed media storage.
+
+Files saved through ContentAddressedStorage are named after the SHA-256 of
+their content, inside the field's upload_to folder:
+
+    videos/files/3f/3f2a...c1.mp4
+
+Saving bytes that are already stored returns the existing name instead of
+writing a second copy, so records uploaded twice share one file (and the
+video worker can reuse the processed output, see videos/processing.py).
+
+A shared file is only deleted once no record refers to it any more:
+connect_reference_counting(Model) releases the old file when a field value
+is replaced and all files when a record is deleted.
+"""
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import posixpath
+import shutil
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file):
+    """
+    SHA-256 hex digest of a Django File or an open binary file.
+    """
+    digest = hashlib.sha256()
+    if hasattr(file, "seek"):
+        file.seek(0)
+    if hasattr(file, "chunks"):
+        for chunk in file.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+# sizeof(SHA256_CTX): eight state words, bit count, 64-byte block, counters
+_SHA256_CTX_SIZE = 112
+
+
+def _load_libcrypto():
+    name = ctypes.util.find_library("crypto")
+    try:
+        library = ctypes.CDLL(name) if name else None
+        if library is None:
+            return None
+        for function in ("SHA256_Init", "SHA256_Update", "SHA256_Final"):
+            getattr(library, function).restype = ctypes.c_int
+    except (AttributeError, OSError):
+        return None
+    library.SHA256_Update.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
+    return library
+
+
+_libcrypto = _load_libcrypto()
+
+
+class ResumableSha256:
+    """
+    SHA-256 whose running state can be stored between requests (the bytes
+    of OpenSSL's SHA256_CTX), so a file received in chunks is hashed as the
+    chunks arrive. Check `available()` first: it needs libcrypto.
+    """
+
+    def __init__(self, state=b""):
+        self._ctx = ctypes.create_string_buffer(_SHA256_CTX_SIZE)
+        if state:
+            if len(state) != _SHA256_CTX_SIZE:
+                raise ValueError("Invalid SHA-256 state.")
+            ctypes.memmove(self._ctx, bytes(state), _SHA256_CTX_SIZE)
+        else:
+            _libcrypto.SHA256_Init(self._ctx)
+
+    @staticmethod
+    def available():
+        return _libcrypto is not None
+
+    def update(self, data):
+        _libcrypto.SHA256_Update(self._ctx, bytes(data), len(data))
+
+    @property
+    def state(self):
+        return self._ctx.raw
+
+    def hexdigest(self):
+        # Finalize a copy, so the state stays usable
+        ctx = ctypes.create_string_buffer(self._ctx.raw, _SHA256_CTX_SIZE)
+        digest = ctypes.create_string_buffer(32)
+        _libcrypto.SHA256_Final(digest, ctx)
+        return digest.raw.hex()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, digest):
+        directory, filename = posixpath.split(name.replace("\\", "/"))
+        extension = os.path.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        hashed = self.hashed_name(name, file_digest(content))
+        if self.exists(hashed):
+            return hashed
+        return super()._save(hashed, content)
+
+    def adopt(self, path, name, digest=None):
+        """
+        Move a local file (e.g. a finished chunked upload) into storage
+        under its content name. A duplicate is discarded instead. Pass the
+        SHA-256 `digest` if it is already known, to skip reading the file.
+        """
+        if digest is None:
+            with open(path, "rb") as handle:
+                digest = file_digest(handle)
+        hashed = self.hashed_name(name, digest)
+
+        if self.exists(hashed):
+            os.remove(path)
+            return hashed
+
+        destination = self.path(hashed)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.move(path, destination)
+        if self.file_permissions_mode is not None:
+            os.chmod(destination, self.file_permissions_mode)
+        return hashed
+
+
+_media_storage = ContentAddressedStorage()
+
+
+def media_storage():
+    """Storage for FileField(storage=media_storage)."""
+    return _media_storage
+
+
+def _file_fields(model):
+    return [
+        field.name
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField)
+        and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def is_referenced(name):
+    """
+    Whether any record still points at the stored file `name`.
+    """
+    for model in apps.get_models():
+        for field_name in _file_fields(model):
+            if model._default_manager.filter(**{field_name: name}).exists():
+                return True
+    return False
+
+
+def release_files(names):
+    """
+    Delete stored files that no record refers to any more, once the
+    current transaction commits.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+
+    def cleanup():
+        for name in names:
+            if not is_referenced(name):
+                _media_storage.delete(name)
+
+    transaction.on_commit(cleanup)
+
+
+def _remember_files(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    fields = _file_fields(sender)
+    instance._stored_files = (
+        sender._default_manager.filter(pk=instance.pk).values(*fields).first() or {}
+    )
+
+
+def _release_replaced_files(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_stored_files", None)
+    if raw or not previous:
+        return
+    release_files(
+        name for field, name in previous.items()
+        if name and name != getattr(instance, field).name
+    )
+    instance._stored_files = None
+
+
+def _release_deleted_files(sender, instance, **kwargs):
+    release_files(getattr(instance, field).name for field in _file_fields(sender))
+
+
+def connect_reference_counting(model):
+    """
+    Release content-addressed files of `model` when they are replaced or
+    their record is deleted.
+    """
+    uid = f"content-addressed-{model._meta.label_lower}"
+    pre_save.connect(_remember_files, sender=model, dispatch_uid=uid)
+    post_save.connect(_release_replaced_files, sender=model, dispatch_uid=uid)
+    post_delete.connect(_release_deleted_files, sender=model, dispatch_uid=uid)
@@ -7,6 +7,7 @@ from .models import (
     Choice,
     Exam,
     ExamResitPermission,
+    PreparedPaper,
     Question,
     TeacherProfile,
 )
@@ -57,6 +58,8 @@ class ExamAdmin(admin.ModelAdmin):
         "price",  # ✅ SHOW PRICE
         "created_by",
         "duration_minutes",
+        "opens_at",
+        "closes_at",
         "is_published",
         "created_at",
         "resits_link",
@@ -114,3 +117,12 @@ class ExamResitPermissionAdmin(admin.ModelAdmin):
     def get_allowed_attempts(self, obj):
         return obj.allowed_attempts
     get_allowed_attempts.short_description = "Allowed Attempts"
+
+
+# -------------------- PreparedPaper --------------------
+@admin.register(PreparedPaper)
+class PreparedPaperAdmin(admin.ModelAdmin):
+    list_display = ("id", "exam", "user", "attempt", "created_at")
+    list_filter = ("exam",)
+    search_fields = ("exam__title", "user__username")
+    raw_id_fields = ("attempt",)
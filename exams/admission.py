@@ -0,0 +1,70 @@
+"""
+Admission queue for starting exams.
+
+When many students press Start at the same moment, each one is given the
+next free admission slot. Slots are 1 / EXAM_ADMISSION_RATE seconds apart,
+so new attempts are created at a steady rate and the rest wait on a
+waiting-room page that retries automatically when their slot comes up.
+
+Slots are taken from an AdmissionCounter row per exam with one atomic
+UPDATE, so every worker hands out distinct slots.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import AdmissionCounter
+
+
+def _rate():
+    return getattr(settings, "EXAM_ADMISSION_RATE", 0)
+
+
+def _session_key(exam_id):
+    return f"exam_admission_{exam_id}"
+
+
+def _reserve_slot(exam_id):
+    """
+    Return the unix time at which the caller may start the exam.
+    """
+    rate = _rate()
+    now_tick = int(time.time() * rate)
+    counter = AdmissionCounter.objects.filter(exam_id=exam_id)
+
+    with transaction.atomic():
+        # The next slot, or the present one if the queue has drained. The
+        # UPDATE locks the row until commit, so the read below is ours.
+        if not counter.update(last_tick=Greatest(F("last_tick") + 1, now_tick)):
+            AdmissionCounter.objects.bulk_create(
+                [AdmissionCounter(exam_id=exam_id, last_tick=now_tick - 1)],
+                ignore_conflicts=True,
+            )
+            counter.update(last_tick=Greatest(F("last_tick") + 1, now_tick))
+        tick = counter.values_list("last_tick", flat=True).get()
+
+    return tick / rate
+
+
+def seconds_until_admitted(request, exam):
+    """
+    0 if the student may start now, otherwise how long to wait.
+    A student keeps their place (stored in the session) across retries.
+    """
+    if _rate() <= 0:
+        return 0
+
+    key = _session_key(exam.id)
+    admit_at = request.session.get(key)
+    if admit_at is None:
+        admit_at = _reserve_slot(exam.id)
+        request.session[key] = admit_at
+
+    wait = admit_at - time.time()
+    if wait <= 0:
+        request.session.pop(key, None)
+        return 0
+    return int(wait) + 1
@@ -0,0 +1,163 @@
+"""
+Optional write-behind buffer for student answers.
+
+When settings.EXAM_ANSWER_WRITE_BEHIND is on, answer edits are written to a
+shared cache (one key per attempt/question/field) instead of the Answer table.
+Each edit only sets keys, so concurrent saves of the same question (autosave
+and navigation, two tabs) never overwrite each other with stale copies.
+Buffered edits are copied to Answer rows in one batched transaction when the
+student navigates, when the exam is submitted, and periodically by the
+`flush_answer_buffer` management command.
+
+Keys are only removed after the final flush has been committed, so a crashed
+worker never loses an answer: whatever is still in the cache is picked up by
+the next flush.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Answer, AttemptQuestion
+
+BUFFERED_FIELDS = (
+    "selected_bank_choice_id",
+    "structured_part_a",
+    "structured_part_b",
+    "structured_part_c",
+    "sequencing_answer",
+)
+
+
+def write_behind_enabled():
+    return getattr(settings, "EXAM_ANSWER_WRITE_BEHIND", False)
+
+
+def _cache():
+    return caches[getattr(settings, "EXAM_ANSWER_BUFFER_CACHE", "default")]
+
+
+def _timeout():
+    return getattr(settings, "EXAM_ANSWER_BUFFER_TIMEOUT", 7 * 24 * 60 * 60)
+
+
+def _key(attempt_id, bank_question_id, field):
+    return f"exam-answer:{attempt_id}:{bank_question_id}:{field}"
+
+
+def _keys(attempt_id, bank_question_ids):
+    """{cache key: (bank_question_id, field)} for every buffered field."""
+    return {
+        _key(attempt_id, bq_id, name): (bq_id, name)
+        for bq_id in bank_question_ids
+        for name in BUFFERED_FIELDS
+    }
+
+
+def buffer_answer(attempt_id, bank_question_id, fields):
+    """
+    Buffer `fields` for one question. Fields not given keep their
+    buffered value.
+    """
+    _cache().set_many(
+        {
+            _key(attempt_id, bank_question_id, name): value
+            for name, value in fields.items()
+            if name in BUFFERED_FIELDS
+        },
+        _timeout(),
+    )
+
+
+def buffered_answers(attempt_id, bank_question_ids):
+    """
+    Return {bank_question_id: fields} for every question that has
+    unflushed edits.
+    """
+    if not write_behind_enabled():
+        return {}
+
+    keys = _keys(attempt_id, bank_question_ids)
+    pending = {}
+    for key, value in _cache().get_many(list(keys)).items():
+        bq_id, name = keys[key]
+        pending.setdefault(bq_id, {})[name] = value
+    return pending
+
+
+def apply_fields(answer, fields):
+    """
+    Copy buffered fields onto an Answer instance.
+    Returns True if anything changed.
+    """
+    changed = False
+    for name, value in fields.items():
+        if name in BUFFERED_FIELDS and getattr(answer, name) != value:
+            setattr(answer, name, value)
+            changed = True
+    return changed
+
+
+def overlay_answers(attempt_id, answers):
+    """
+    Apply buffered edits to a list of Answer instances in memory,
+    so pages show what the student last typed.
+    """
+    answers = list(answers)
+    pending = buffered_answers(
+        attempt_id,
+        [a.bank_question_id for a in answers if a.bank_question_id],
+    )
+    for answer in answers:
+        fields = pending.get(answer.bank_question_id)
+        if fields:
+            apply_fields(answer, fields)
+    return answers
+
+
+def flush_attempt(attempt, clear=False):
+    """
+    Write all buffered edits for an attempt in one transaction.
+
+    clear=True removes the cache keys once the transaction commits; use it
+    for the final flush on submit.
+    Returns the number of Answer rows updated.
+    """
+    if not write_behind_enabled():
+        return 0
+
+    bq_ids = list(
+        AttemptQuestion.objects.filter(attempt=attempt).values_list(
+            "bank_question_id", flat=True
+        )
+    )
+    pending = buffered_answers(attempt.id, bq_ids)
+    if not pending:
+        return 0
+
+    with transaction.atomic():
+        answers = list(
+            Answer.objects.select_for_update().filter(
+                attempt=attempt,
+                bank_question_id__in=list(pending),
+            )
+        )
+
+        existing = {a.bank_question_id for a in answers}
+        for bq_id in pending:
+            if bq_id not in existing:
+                answers.append(
+                    Answer.objects.create(attempt=attempt, bank_question_id=bq_id)
+                )
+
+        changed = [a for a in answers if apply_fields(a, pending[a.bank_question_id])]
+        if changed:
+            Answer.objects.bulk_update(
+                changed,
+                [name.removesuffix("_id") for name in BUFFERED_FIELDS],
+            )
+
+        if clear:
+            keys = list(_keys(attempt.id, pending))
+            transaction.on_commit(lambda: _cache().delete_many(keys))
+
+    return len(changed)
@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from exams import answer_buffer
+from exams.models import Attempt, Exam
+
+# Attempts that ran out of time are still flushed for this long, in case the
+# student never reached the submit page.
+GRACE = timedelta(minutes=15)
+
+
+class Command(BaseCommand):
+    help = "Write buffered (write-behind) answers of open attempts to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and flush every N seconds (0 = flush once and exit).",
+        )
+
+    def handle(self, *args, **options):
+        if not answer_buffer.write_behind_enabled():
+            self.stdout.write("EXAM_ANSWER_WRITE_BEHIND is off; nothing to flush.")
+            return
+
+        interval = options["interval"]
+        while True:
+            updated = 0
+            for attempt in self.open_attempts():
+                updated += answer_buffer.flush_attempt(attempt)
+            self.stdout.write(f"Flushed {updated} answer(s).")
+
+            if interval <= 0:
+                break
+            time.sleep(interval)
+
+    def open_attempts(self):
+        """
+        Unsubmitted attempts that can still have buffered edits: started no
+        longer ago than the longest exam, plus GRACE.
+        """
+        longest = Exam.objects.aggregate(longest=Max("duration_minutes"))["longest"] or 0
+        now = timezone.now()
+        attempts = Attempt.objects.filter(
+            submitted_at__isnull=True,
+            started_at__gte=now - timedelta(minutes=longest) - GRACE,
+        )
+        for attempt in attempts.iterator():
+            if attempt.started_at + timedelta(seconds=attempt.duration_seconds) + GRACE >= now:
+                yield attempt
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from exams import papers
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Pre-generate student question papers for exams scheduled to open soon."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lookahead",
+            type=int,
+            default=120,
+            help="Prepare papers for exams opening within this many minutes (default 120).",
+        )
+        parser.add_argument(
+            "--exam",
+            type=int,
+            help="Only prepare papers for this exam id (ignores the schedule).",
+        )
+
+    def handle(self, *args, **options):
+        if options["exam"]:
+            exams = Exam.objects.filter(id=options["exam"])
+        else:
+            now = timezone.now()
+            exams = Exam.objects.filter(
+                is_published=True,
+                use_question_bank=True,
+                opens_at__gt=now,
+                opens_at__lte=now + timedelta(minutes=options["lookahead"]),
+            )
+
+        for exam in exams:
+            try:
+                created = papers.prepare_papers(exam)
+            except papers.NotEnoughQuestions as exc:
+                self.stderr.write(f"{exam}: {exc}")
+                continue
+            self.stdout.write(f"{exam}: prepared {created} paper(s).")
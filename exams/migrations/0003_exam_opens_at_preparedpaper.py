@@ -0,0 +1,36 @@
+# Generated by Django 5.0.10 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_alter_attempt_max_score_alter_attempt_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='opens_at',
+            field=models.DateTimeField(blank=True, help_text='Scheduled start time. Question papers are prepared before this time.', null=True),
+        ),
+        migrations.CreateModel(
+            name='PreparedPaper',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_ids', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempt', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prepared_paper', to='exams.attempt')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prepared_papers', to='exams.exam')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prepared_papers', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='preparedpaper',
+            constraint=models.UniqueConstraint(condition=models.Q(('attempt__isnull', True)), fields=('exam', 'user'), name='unique_unused_paper_per_student'),
+        ),
+    ]
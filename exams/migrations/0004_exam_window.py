@@ -0,0 +1,23 @@
+# Generated by Django 5.0.10 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_exam_opens_at_preparedpaper'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='closes_at',
+            field=models.DateTimeField(blank=True, help_text='No attempt can start or continue after this time.', null=True),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='late_start_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Students can still start this many minutes after the exam opens.', null=True),
+        ),
+    ]
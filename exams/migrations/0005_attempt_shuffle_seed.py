@@ -0,0 +1,30 @@
+# Generated by Django 5.0.10 on 2026-10-19 06:50
+
+import random
+
+import exams.models
+from django.db import migrations, models
+
+
+def seed_existing_attempts(apps, schema_editor):
+    Attempt = apps.get_model("exams", "Attempt")
+    attempts = list(Attempt.objects.only("id"))
+    for attempt in attempts:
+        attempt.shuffle_seed = random.getrandbits(31)
+    Attempt.objects.bulk_update(attempts, ["shuffle_seed"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_exam_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='shuffle_seed',
+            field=models.PositiveIntegerField(default=exams.models.new_shuffle_seed, editable=False),
+        ),
+        migrations.RunPython(seed_existing_attempts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.10 on 2026-10-19 06:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def renumber_duplicate_attempts(apps, schema_editor):
+    """
+    Older code could give two attempts the same number.
+    Renumber those users' attempts 1..n by start time.
+    """
+    Attempt = apps.get_model("exams", "Attempt")
+    duplicated = (
+        Attempt.objects.values("user_id", "exam_id", "attempt_no")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .values_list("user_id", "exam_id")
+        .distinct()
+    )
+    for user_id, exam_id in set(duplicated):
+        attempts = list(
+            Attempt.objects.filter(user_id=user_id, exam_id=exam_id).order_by("started_at", "id")
+        )
+        for number, attempt in enumerate(attempts, start=1):
+            attempt.attempt_no = number
+        Attempt.objects.bulk_update(attempts, ["attempt_no"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0005_attempt_shuffle_seed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attempt',
+            constraint=models.UniqueConstraint(fields=('user', 'exam', 'attempt_no'), name='unique_attempt_no_per_user_exam'),
+        ),
+    ]
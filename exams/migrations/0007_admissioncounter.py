@@ -0,0 +1,21 @@
+# Generated by Django 5.0.10 on 2026-10-19 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0006_unique_attempt_no'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionCounter',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='admission_counter', serialize=False, to='exams.exam')),
+                ('last_tick', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
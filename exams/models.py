@@ -1,3 +1,6 @@
+import random
+from datetime import timedelta
+
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
@@ -118,9 +121,65 @@ class Exam(models.Model):
     use_question_bank = models.BooleanField(default=True)
     question_count = models.PositiveIntegerField(default=50)
 
+    opens_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Scheduled start time. Question papers are prepared before this time.",
+    )
+    closes_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="No attempt can start or continue after this time.",
+    )
+    late_start_minutes = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Students can still start this many minutes after the exam opens.",
+    )
+
+    WINDOW_OPEN = "open"
+    WINDOW_NOT_OPEN = "not_open"
+    WINDOW_CLOSED = "closed"
+
     def __str__(self):
         return self.title
 
+    @property
+    def start_deadline(self):
+        """
+        Last moment a new attempt can be started (closing time or
+        late-start cutoff, whichever comes first).
+        """
+        deadlines = []
+        if self.closes_at:
+            deadlines.append(self.closes_at)
+        if self.opens_at and self.late_start_minutes is not None:
+            deadlines.append(self.opens_at + timedelta(minutes=self.late_start_minutes))
+        return min(deadlines) if deadlines else None
+
+    def window_status(self, now=None):
+        now = now or timezone.now()
+        if self.opens_at and now < self.opens_at:
+            return self.WINDOW_NOT_OPEN
+        deadline = self.start_deadline
+        if deadline and now >= deadline:
+            return self.WINDOW_CLOSED
+        return self.WINDOW_OPEN
+
+    @property
+    def is_open_for_start(self):
+        return self.window_status() == self.WINDOW_OPEN
+
+    def attempt_duration_seconds(self, now=None):
+        """
+        Full duration, cut short so the attempt ends at closes_at.
+        """
+        seconds = self.duration_minutes * 60
+        if self.closes_at:
+            now = now or timezone.now()
+            seconds = min(seconds, max(0, int((self.closes_at - now).total_seconds())))
+        return seconds
+
 
 class Question(models.Model):
     """
@@ -232,6 +291,10 @@ class ExamResitPermission(models.Model):
         return f"{self.user} - {self.exam} (allowed={self.allowed_attempts}, visible={self.can_view})"
 
 
+def new_shuffle_seed():
+    return random.getrandbits(31)
+
+
 class Attempt(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -252,10 +315,28 @@ class Attempt(models.Model):
     score = models.FloatField(default=0)
     max_score = models.FloatField(default=0)
 
+    # Drives the order of choices and sequencing items shown in this attempt.
+    shuffle_seed = models.PositiveIntegerField(default=new_shuffle_seed, editable=False)
+
     PASS_PERCENTAGE = 50
 
     class Meta:
         ordering = ["-started_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "exam", "attempt_no"],
+                name="unique_attempt_no_per_user_exam",
+            ),
+        ]
+
+    def shuffled(self, items, kind, question_id):
+        """
+        Return `items` in this attempt's order for one question.
+        The same attempt always gets the same order, so nothing is stored.
+        """
+        items = sorted(items, key=lambda item: item.id)
+        random.Random(f"{self.shuffle_seed}:{kind}:{question_id}").shuffle(items)
+        return items
 
     def time_left_seconds(self):
         if self.submitted_at:
@@ -383,6 +464,64 @@ class AttemptQuestion(models.Model):
         return f"Attempt {self.attempt_id} - Q{self.order}"
 
 
+class PreparedPaper(models.Model):
+    """
+    A question paper generated ahead of a scheduled exam.
+    start_exam attaches it to the student's new Attempt instead of
+    sampling the bank at start time.
+    """
+    exam = models.ForeignKey(
+        Exam,
+        on_delete=models.CASCADE,
+        related_name="prepared_papers",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="prepared_papers",
+    )
+    # Ordered BankQuestion ids
+    question_ids = models.JSONField(default=list)
+    attempt = models.OneToOneField(
+        Attempt,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="prepared_paper",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["exam", "user"],
+                condition=models.Q(attempt__isnull=True),
+                name="unique_unused_paper_per_student",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.exam} - Paper {self.id}"
+
+
+class AdmissionCounter(models.Model):
+    """
+    Last admission slot handed out for an exam (exams/admission.py).
+    Slots are taken with an atomic UPDATE of this row.
+    """
+    exam = models.OneToOneField(
+        Exam,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="admission_counter",
+    )
+    # Slot number: unix time * EXAM_ADMISSION_RATE
+    last_tick = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.exam} - slot {self.last_tick}"
+
+
 class Answer(models.Model):
     attempt = models.ForeignKey(
         Attempt,
@@ -0,0 +1,118 @@
+"""
+Question paper generation.
+
+Papers for a scheduled exam (Exam.opens_at) are prepared in the background by
+the `prepare_exam_papers` command, so start_exam only has to attach a ready
+paper to the new Attempt instead of sampling the bank for every student at
+the same moment.
+"""
+from random import sample
+
+from django.db import transaction
+
+from .models import Answer, AttemptQuestion, BankQuestion, ExamResitPermission, PreparedPaper
+
+
+class NotEnoughQuestions(Exception):
+    pass
+
+
+def sample_question_ids(exam, bank_ids=None):
+    """
+    Pick exam.question_count random bank question ids for one paper.
+    Pass bank_ids to reuse one id list across many papers.
+    """
+    if bank_ids is None:
+        bank_ids = list(
+            BankQuestion.objects.filter(subject_id=exam.subject_id).values_list("id", flat=True)
+        )
+
+    if len(bank_ids) < exam.question_count:
+        raise NotEnoughQuestions(
+            f"Not enough questions in bank. Need {exam.question_count}, have {len(bank_ids)}"
+        )
+
+    return sample(bank_ids, exam.question_count)
+
+
+def prepare_papers(exam):
+    """
+    Create one unused paper for every student allowed to view the exam
+    who does not already have one. Returns the number of papers created.
+    """
+    if not exam.use_question_bank or not exam.subject_id:
+        return 0
+
+    bank_ids = list(
+        BankQuestion.objects.filter(subject_id=exam.subject_id).values_list("id", flat=True)
+    )
+
+    has_paper = PreparedPaper.objects.filter(exam=exam, attempt__isnull=True).values("user_id")
+    user_ids = (
+        ExamResitPermission.objects.filter(exam=exam, can_view=True)
+        .exclude(user_id__in=has_paper)
+        .values_list("user_id", flat=True)
+    )
+
+    papers = [
+        PreparedPaper(
+            exam=exam,
+            user_id=user_id,
+            question_ids=sample_question_ids(exam, bank_ids),
+        )
+        for user_id in user_ids
+    ]
+    # Rows skipped by ignore_conflicts (a paper prepared concurrently) are
+    # not reported: count what is actually there before and after.
+    exam_papers = PreparedPaper.objects.filter(exam=exam)
+    with transaction.atomic():
+        before = exam_papers.count()
+        PreparedPaper.objects.bulk_create(papers, batch_size=500, ignore_conflicts=True)
+        return max(0, exam_papers.count() - before)
+
+
+def claim_paper(exam, user, attempt):
+    """
+    Attach the student's prepared paper to `attempt`.
+    Returns the question ids, or None if there is no usable paper.
+    """
+    paper = (
+        PreparedPaper.objects.select_for_update()
+        .filter(exam=exam, user=user, attempt__isnull=True)
+        .first()
+    )
+    if paper is None:
+        return None
+
+    question_ids = list(paper.question_ids or [])
+    existing = set(
+        BankQuestion.objects.filter(
+            id__in=question_ids,
+            subject_id=exam.subject_id,
+        ).values_list("id", flat=True)
+    )
+
+    # The bank or the exam settings changed after the paper was prepared.
+    if len(question_ids) != exam.question_count or len(existing) != len(question_ids):
+        paper.delete()
+        return None
+
+    paper.attempt = attempt
+    paper.save(update_fields=["attempt"])
+    return question_ids
+
+
+@transaction.atomic
+def build_attempt_paper(attempt, question_ids):
+    """
+    Insert the AttemptQuestion and empty Answer rows for an attempt
+    with two bulk inserts.
+    """
+    AttemptQuestion.objects.bulk_create([
+        AttemptQuestion(attempt=attempt, bank_question_id=bq_id, order=idx)
+        for idx, bq_id in enumerate(question_ids, start=1)
+    ])
+    Answer.objects.bulk_create([
+        Answer(attempt=attempt, bank_question_id=bq_id)
+        for bq_id in question_ids
+    ])
@@ -115,13 +115,24 @@ class ExamForm(ModelForm):
         model = Exam
         fields = [
             "title", "description", "subject", "use_question_bank", "question_count",
-            "duration_minutes", "is_published", "price",
+            "duration_minutes", "opens_at", "closes_at", "late_start_minutes",
+            "is_published", "price",
         ]
+        widgets = {
+            "opens_at": forms.DateTimeInput(attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"),
+            "closes_at": forms.DateTimeInput(attrs={"type": "datetime-local"}, format="%Y-%m-%dT%H:%M"),
+        }
 
     def clean(self):
         cleaned = super().clean()
         if cleaned.get("use_question_bank") and not cleaned.get("subject"):
             raise forms.ValidationError("Please select a subject when using Question Bank.")
+        opens_at = cleaned.get("opens_at")
+        closes_at = cleaned.get("closes_at")
+        if opens_at and closes_at and closes_at <= opens_at:
+            raise forms.ValidationError("Closing time must be after the opening time.")
+        if cleaned.get("late_start_minutes") is not None and not opens_at:
+            raise forms.ValidationError("Set an opening time to use a late-start cutoff.")
         return cleaned
 
 
@@ -731,6 +742,8 @@ def attempt_detail(request, exam_id: int, attempt_id: int):
         if qtype in ("MCQ", "TF"):
             row["selected"] = selected_choice
             row["correct"] = correct_choice
+            if a.bank_question:
+                row["shown"] = attempt.shuffled(qobj.choices.all(), "choices", qobj.id)
 
             if selected_choice and correct_choice and selected_choice.id == correct_choice.id:
                 row["is_correct"] = True
@@ -770,6 +783,8 @@ def attempt_detail(request, exam_id: int, attempt_id: int):
 
             row["selected"] = [id_to_text.get(x, x) for x in submitted]
             row["correct"] = [item.text for item in correct_items]
+            if a.bank_question:
+                row["shown"] = attempt.shuffled(correct_items, "sequence", qobj.id)
 
             correct_positions = 0
             for i, cid in enumerate(correct_ids):
@@ -1,3 +1,84 @@
+from contextlib import contextmanager
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, OperationalError
 from django.test import TestCase
+from django.urls import reverse
+
+from . import admission
+from .models import Attempt, BankQuestion, Exam, ExamResitPermission, Subject
+
+
+class StartExamConflictTests(TestCase):
+    """start_exam when another request creates the attempt at the same time."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("student", password="x")
+        subject = Subject.objects.create(name="Biology")
+        BankQuestion.objects.create(subject=subject, text="Q1", qtype="STRUCT")
+        cls.exam = Exam.objects.create(
+            title="Cells", subject=subject, question_count=1, is_published=True
+        )
+        ExamResitPermission.objects.create(exam=cls.exam, user=cls.user)
+        cls.url = reverse("start_exam", args=[cls.exam.id])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    @contextmanager
+    def conflict(self, error, concurrent=True):
+        """
+        Make Attempt creation fail with `error`. With `concurrent`, another
+        request inserts the attempt after this one checked for it.
+        """
+        def admit(request, exam):
+            if concurrent:
+                Attempt.objects.bulk_create([
+                    Attempt(user=self.user, exam=exam, attempt_no=1, duration_seconds=60)
+                ])
+            return 0
+
+        with mock.patch.object(admission, "seconds_until_admitted", side_effect=admit), \
+                mock.patch.object(Attempt.objects, "create", side_effect=error):
+            yield
+
+    def test_unique_violation_uses_existing_attempt(self):
+        with self.conflict(IntegrityError("UNIQUE constraint failed")):
+            response = self.client.get(self.url)
+
+        attempt = Attempt.objects.get(user=self.user, exam=self.exam)
+        self.assertRedirects(
+            response,
+            reverse("take_exam_q", args=[attempt.id, 1]),
+            fetch_redirect_response=False,
+        )
+
+    def test_database_locked_uses_existing_attempt(self):
+        with self.conflict(OperationalError("database is locked")):
+            response = self.client.get(self.url)
+
+        attempt = Attempt.objects.get(user=self.user, exam=self.exam)
+        self.assertRedirects(
+            response,
+            reverse("take_exam_q", args=[attempt.id, 1]),
+            fetch_redirect_response=False,
+        )
+
+    def test_database_locked_retries_once(self):
+        with self.conflict(OperationalError("database is locked"), concurrent=False):
+            response = self.client.get(self.url)
+            self.assertRedirects(response, self.url + "?retry=1", fetch_redirect_response=False)
+
+            response = self.client.get(self.url + "?retry=1")
+            self.assertRedirects(
+                response, reverse("student_dashboard"), fetch_redirect_response=False
+            )
+
+        self.assertFalse(Attempt.objects.filter(user=self.user).exists())
 
-# Create your tests here.
+    def test_other_database_errors_are_raised(self):
+        with self.conflict(OperationalError("disk I/O error"), concurrent=False):
+            with self.assertRaises(OperationalError):
+                self.client.get(self.url)
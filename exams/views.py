@@ -1,16 +1,16 @@
-from random import sample
-
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm
-from django.db import transaction
+from django.db import IntegrityError, OperationalError, transaction
 from django.db.models import Max
 from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 
+from . import admission, answer_buffer, papers
 from .models import (
     Subject,
-    BankQuestion,
     AttemptQuestion,
     Question,
     Answer,
@@ -67,7 +67,12 @@ def get_resume_qno(attempt):
 
     answered_bq_ids = set()
 
-    for a in attempt.answers.select_related("bank_question", "selected_bank_choice").all():
+    answers = answer_buffer.overlay_answers(
+        attempt.id,
+        attempt.answers.select_related("bank_question", "selected_bank_choice").all(),
+    )
+
+    for a in answers:
         if a.bank_question_id is None:
             continue
 
@@ -92,6 +97,58 @@ def get_resume_qno(attempt):
     return total
 
 
+def answer_fields_from_post(question, data, clear_other_types=True):
+    """
+    Build Answer field values from a question page POST.
+
+    clear_other_types=True also blanks the fields that belong to the other
+    question types (what the full page form does).
+    """
+    fields = {}
+
+    if question.qtype in ["MCQ", "TF"]:
+        if clear_other_types:
+            fields.update({
+                "structured_part_a": "",
+                "structured_part_b": "",
+                "structured_part_c": "",
+                "sequencing_answer": [],
+            })
+
+        choice_id = data.get("answer", "").strip()
+        fields["selected_bank_choice_id"] = None
+        if choice_id:
+            fields["selected_bank_choice_id"] = BankChoice.objects.filter(
+                id=choice_id,
+                question=question,
+            ).values_list("id", flat=True).first()
+
+    elif question.qtype == "STRUCT":
+        if clear_other_types:
+            fields.update({
+                "selected_bank_choice_id": None,
+                "sequencing_answer": [],
+            })
+
+        fields["structured_part_a"] = data.get("part_a", "").strip()
+        fields["structured_part_b"] = data.get("part_b", "").strip()
+        fields["structured_part_c"] = data.get("part_c", "").strip()
+
+    elif question.qtype == "SEQ":
+        if clear_other_types:
+            fields.update({
+                "selected_bank_choice_id": None,
+                "structured_part_a": "",
+                "structured_part_b": "",
+                "structured_part_c": "",
+            })
+
+        seq_value = data.get("sequence_answer", "").strip()
+        fields["sequencing_answer"] = seq_value.split(",") if seq_value else []
+
+    return fields
+
+
 def _lines(text):
     if not text:
         return []
@@ -206,6 +263,8 @@ def student_dashboard(request):
 
         action = {"label": "", "url_name": "", "arg": None, "args": None}
 
+        window = exam.window_status()
+
         if latest is None:
             status = "Not started"
             action.update({
@@ -213,6 +272,12 @@ def student_dashboard(request):
                 "url_name": "exam_instructions",
                 "arg": exam.id,
             })
+            if window == Exam.WINDOW_NOT_OPEN:
+                status = f"Opens {timezone.localtime(exam.opens_at):%d %b %Y %H:%M}"
+                action["label"] = ""
+            elif window == Exam.WINDOW_CLOSED:
+                status = "Closed"
+                action["label"] = ""
 
         elif not latest.is_submitted:
             status = f"In progress (time left: {latest.time_left_seconds()}s)"
@@ -225,7 +290,7 @@ def student_dashboard(request):
 
         else:
             status = f"Submitted ({latest.score}/{latest.max_score})"
-            if remaining > 0:
+            if remaining > 0 and window == Exam.WINDOW_OPEN:
                 action.update({
                     "label": f"Re-sit ({remaining} left)",
                     "url_name": "exam_instructions",
@@ -327,7 +392,16 @@ def exam_instructions(request, exam_id):
 def start_exam(request, exam_id):
     exam = get_object_or_404(Exam, id=exam_id, is_published=True)
 
-    if not can_view_exam(request.user, exam):
+    # Lock the student's permission row so a double click or a second tab
+    # waits here instead of creating a second attempt (PostgreSQL).
+    # SQLite has a single writer; the unique attempt_no constraint below
+    # catches whatever gets through.
+    perm = (
+        ExamResitPermission.objects.select_for_update()
+        .filter(user=request.user, exam=exam)
+        .first()
+    )
+    if not perm or not perm.can_view:
         return redirect("student_dashboard")
 
     unfinished = Attempt.objects.filter(
@@ -340,45 +414,63 @@ def start_exam(request, exam_id):
         qno = get_resume_qno(unfinished)
         return redirect("take_exam_q", attempt_id=unfinished.id, qno=qno)
 
-    allowed = get_allowed_attempts(request.user, exam)
+    allowed = perm.allowed_attempts
     used = Attempt.objects.filter(user=request.user, exam=exam).count()
     if used >= allowed:
         return redirect("student_dashboard")
 
-    attempt_no = get_next_attempt_no(request.user, exam)
-    attempt = Attempt.objects.create(
-        user=request.user,
-        exam=exam,
-        attempt_no=attempt_no,
-        duration_seconds=exam.duration_minutes * 60,
-    )
+    window = exam.window_status()
+    if window == Exam.WINDOW_NOT_OPEN:
+        messages.info(request, f"{exam.title} opens at {timezone.localtime(exam.opens_at):%d %b %Y %H:%M}.")
+        return redirect("student_dashboard")
+    if window == Exam.WINDOW_CLOSED:
+        messages.error(request, f"{exam.title} can no longer be started.")
+        return redirect("student_dashboard")
+
+    wait = admission.seconds_until_admitted(request, exam)
+    if wait:
+        return render(request, "exams/waiting_room.html", {
+            "exam": exam,
+            "wait_seconds": wait,
+        })
 
     if not exam.use_question_bank or not exam.subject_id:
         raise Http404("Exam is not configured to use question bank / subject missing.")
 
-    bank_qs = list(
-        BankQuestion.objects.filter(subject_id=exam.subject_id).prefetch_related(
-            "choices", "sequence_items"
-        )
-    )
-
-    if len(bank_qs) < exam.question_count:
-        raise Http404(
-            f"Not enough questions in bank. Need {exam.question_count}, have {len(bank_qs)}"
-        )
+    try:
+        with transaction.atomic():
+            attempt = Attempt.objects.create(
+                user=request.user,
+                exam=exam,
+                attempt_no=get_next_attempt_no(request.user, exam),
+                duration_seconds=exam.attempt_duration_seconds(),
+            )
+    except (IntegrityError, OperationalError) as exc:
+        if isinstance(exc, OperationalError) and "locked" not in str(exc):
+            raise
+        # A concurrent request created this attempt first; use that one.
+        # On SQLite that request may still hold the write lock, which shows
+        # up as "database is locked" instead of a unique violation.
+        unfinished = Attempt.objects.filter(
+            user=request.user,
+            exam=exam,
+            submitted_at__isnull=True,
+        ).first()
+        if unfinished:
+            return redirect("take_exam_q", attempt_id=unfinished.id, qno=get_resume_qno(unfinished))
+        if isinstance(exc, OperationalError) and "retry" not in request.GET:
+            # Not visible in this transaction yet; retry once in a new request.
+            return redirect(reverse("start_exam", args=[exam.id]) + "?retry=1")
+        return redirect("student_dashboard")
 
-    selected = sample(bank_qs, exam.question_count)
+    question_ids = papers.claim_paper(exam, request.user, attempt)
+    if question_ids is None:
+        try:
+            question_ids = papers.sample_question_ids(exam)
+        except papers.NotEnoughQuestions as exc:
+            raise Http404(str(exc))
 
-    for idx, bq in enumerate(selected, start=1):
-        AttemptQuestion.objects.create(
-            attempt=attempt,
-            bank_question=bq,
-            order=idx,
-        )
-        Answer.objects.create(
-            attempt=attempt,
-            bank_question=bq,
-        )
+    papers.build_attempt_paper(attempt, question_ids)
 
     return redirect("take_exam_q", attempt_id=attempt.id, qno=1)
 
@@ -428,12 +520,13 @@ def take_exam_q(request, attempt_id, qno):
 
     aq = aqs[qno - 1]
     question = aq.bank_question
-    choices = list(question.choices.all()) if question else []
+    choices = attempt.shuffled(question.choices.all(), "choices", question.id) if question else []
 
-    ans, _ = Answer.objects.get_or_create(
-        attempt=attempt,
-        bank_question=question,
-    )
+    # Only read here; the row is created when an answer is saved
+    ans = Answer.objects.filter(attempt=attempt, bank_question=question).first()
+    if ans is None:
+        ans = Answer(attempt=attempt, bank_question=question)
+    answer_buffer.overlay_answers(attempt.id, [ans])
 
     sequence_items = []
     if question and question.qtype == "SEQ":
@@ -446,44 +539,22 @@ def take_exam_q(request, attempt_id, qno):
             remaining = [item for item in all_items if str(item.id) not in saved_ids]
             sequence_items = ordered_saved + remaining
         else:
-            import random
-            sequence_items = all_items[:]
-            random.shuffle(sequence_items)
+            sequence_items = attempt.shuffled(all_items, "sequence", question.id)
 
     if request.method == "POST" and attempt.submitted_at is None:
-        if question.qtype in ["MCQ", "TF"]:
-            ans.structured_part_a = ""
-            ans.structured_part_b = ""
-            ans.structured_part_c = ""
-            ans.sequencing_answer = []
-
-            choice_id = request.POST.get("answer", "").strip()
-            if choice_id:
-                ans.selected_bank_choice = BankChoice.objects.filter(
-                    id=choice_id,
-                    question=question,
-                ).first()
-            else:
-                ans.selected_bank_choice = None
-
-        elif question.qtype == "STRUCT":
-            ans.selected_bank_choice = None
-            ans.sequencing_answer = []
-
-            ans.structured_part_a = request.POST.get("part_a", "").strip()
-            ans.structured_part_b = request.POST.get("part_b", "").strip()
-            ans.structured_part_c = request.POST.get("part_c", "").strip()
-
-        elif question.qtype == "SEQ":
-            ans.selected_bank_choice = None
-            ans.structured_part_a = ""
-            ans.structured_part_b = ""
-            ans.structured_part_c = ""
+        fields = answer_fields_from_post(question, request.POST)
 
-            seq_value = request.POST.get("sequence_answer", "").strip()
-            ans.sequencing_answer = seq_value.split(",") if seq_value else []
-
-        ans.save()
+        if answer_buffer.write_behind_enabled():
+            answer_buffer.buffer_answer(attempt.id, question.id, fields)
+            answer_buffer.flush_attempt(attempt)
+        else:
+            if ans.pk is None:
+                ans, _ = Answer.objects.get_or_create(
+                    attempt=attempt,
+                    bank_question=question,
+                )
+            answer_buffer.apply_fields(ans, fields)
+            ans.save()
 
         nav = request.POST.get("nav")
         if nav == "prev" and qno > 1:
@@ -498,9 +569,20 @@ def take_exam_q(request, attempt_id, qno):
     time_left = attempt.time_left_seconds()
 
     answered_bq_ids = set()
-    for a in Answer.objects.filter(attempt=attempt).select_related(
-        "bank_question", "selected_bank_choice"
-    ):
+    answers = list(
+        Answer.objects.filter(attempt=attempt).select_related(
+            "bank_question", "selected_bank_choice"
+        )
+    )
+    # Questions without a row yet may still have buffered edits
+    saved_bq_ids = {a.bank_question_id for a in answers}
+    answers += [
+        Answer(attempt=attempt, bank_question=one_aq.bank_question)
+        for one_aq in aqs
+        if one_aq.bank_question_id and one_aq.bank_question_id not in saved_bq_ids
+    ]
+    answers = answer_buffer.overlay_answers(attempt.id, answers)
+    for a in answers:
         if a.bank_question_id is None:
             continue
 
@@ -567,32 +649,18 @@ def autosave_answer(request, attempt_id, qno):
     aq = aqs[qno - 1]
     bq = aq.bank_question
 
-    ans, _ = Answer.objects.get_or_create(
-        attempt=attempt,
-        bank_question=bq,
-    )
-
     if request.method == "POST":
-        if bq.qtype in ["MCQ", "TF"]:
-            choice_id = request.POST.get("answer", "").strip()
-            if choice_id:
-                ans.selected_bank_choice = BankChoice.objects.filter(
-                    id=choice_id,
-                    question=bq,
-                ).first()
-            else:
-                ans.selected_bank_choice = None
-
-        elif bq.qtype == "STRUCT":
-            ans.structured_part_a = request.POST.get("part_a", "").strip()
-            ans.structured_part_b = request.POST.get("part_b", "").strip()
-            ans.structured_part_c = request.POST.get("part_c", "").strip()
-
-        elif bq.qtype == "SEQ":
-            seq_value = request.POST.get("sequence_answer", "").strip()
-            ans.sequencing_answer = seq_value.split(",") if seq_value else []
+        fields = answer_fields_from_post(bq, request.POST, clear_other_types=False)
 
-        ans.save()
+        if answer_buffer.write_behind_enabled():
+            answer_buffer.buffer_answer(attempt.id, bq.id, fields)
+        else:
+            ans, _ = Answer.objects.get_or_create(
+                attempt=attempt,
+                bank_question=bq,
+            )
+            answer_buffer.apply_fields(ans, fields)
+            ans.save()
 
     return JsonResponse({"ok": True})
 
@@ -608,6 +676,9 @@ def submit_exam(request, attempt_id):
     if attempt.submitted_at:
         return redirect("exam_result", attempt_id=attempt.id)
 
+    # Final flush; buffered keys are dropped once this transaction commits.
+    answer_buffer.flush_attempt(attempt, clear=True)
+
     answers = attempt.answers.select_related(
         "bank_question",
         "selected_bank_choice",
@@ -1,6 +1,18 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import Video, VideoCategory, VideoPurchase, VideoView
+
+from exam_site import entitlements
+
+from .models import (
+    UserDailyVideoStat,
+    Video,
+    VideoCategory,
+    VideoDailyStat,
+    VideoPurchase,
+    VideoUpload,
+    VideoView,
+)
+from .processing import queue_video, refresh_thumbnail_variants
 
 
 @admin.register(VideoCategory)
@@ -16,45 +28,84 @@ class VideoAdmin(admin.ModelAdmin):
     list_display = (
         "title",
         "category",
+        "lesson_order",
         "access_type",
         "price",
         "is_published",
         "is_featured",
         "views_count",
+        "processing_status",
     )
     list_filter = (
         "category",
         "access_type",
         "is_published",
         "is_featured",
+        "processing_status",
     )
     search_fields = ("title", "description")
     prepopulated_fields = {"slug": ("title",)}
-    readonly_fields = ("views_count", "created_at", "updated_at")
+    readonly_fields = (
+        "views_count",
+        "processing_status",
+        "processing_error",
+        "processing_attempts",
+        "processing_progress",
+        "duration_seconds",
+        "video_width",
+        "video_height",
+        "video_codec",
+        "audio_codec",
+        "bit_rate",
+        "file_size",
+        "created_at",
+        "updated_at",
+    )
+    actions = ("reprocess_videos",)
+
+    @admin.action(description="Retry processing of selected failed videos")
+    def reprocess_videos(self, request, queryset):
+        # Ready videos are left alone: processing again would re-encode the
+        # transcoded file and take them offline while it runs.
+        failed = queryset.filter(processing_status=Video.ProcessingStatus.FAILED)
+        queued = 0
+        for video in failed:
+            queue_video(video)
+            queued += 1
+        self.message_user(request, f"{queued} failed video(s) queued for processing.")
 
     def save_model(self, request, obj, form, change):
         if obj.is_published and not obj.published_at:
             obj.published_at = timezone.now()
         obj.full_clean()
         super().save_model(request, obj, form, change)
+        if "thumbnail" in form.changed_data:
+            refresh_thumbnail_variants(obj)
+        if "video_file" in form.changed_data:
+            queue_video(obj)
 
 
 @admin.action(description="Approve selected video purchases")
 def approve_purchases(modeladmin, request, queryset):
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(
         status=VideoPurchase.Status.APPROVED,
         approved_at=timezone.now(),
         approved_by=request.user,
     )
+    # Only once updated: outside a transaction the cache is cleared at once
+    entitlements.invalidate(user_ids)
 
 
 @admin.action(description="Reject selected video purchases")
 def reject_purchases(modeladmin, request, queryset):
+    user_ids = list(queryset.values_list("user_id", flat=True))
     queryset.update(
         status=VideoPurchase.Status.REJECTED,
         approved_at=None,
         approved_by=None,
     )
+    entitlements.invalidate(user_ids)
 
 
 @admin.register(VideoPurchase)
@@ -82,6 +133,57 @@ class VideoPurchaseAdmin(admin.ModelAdmin):
 class VideoViewAdmin(admin.ModelAdmin):
     list_display = ("video", "user", "viewed_at")
     readonly_fields = ("video", "user", "viewed_at")
+    list_select_related = ("video", "user")
+    # Skip the COUNT(*) over the whole table on every page
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(VideoDailyStat)
+class VideoDailyStatAdmin(admin.ModelAdmin):
+    list_display = ("date", "video", "views", "unique_viewers")
+    list_select_related = ("video",)
+    date_hierarchy = "date"
+    search_fields = ("video__title",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(UserDailyVideoStat)
+class UserDailyVideoStatAdmin(admin.ModelAdmin):
+    list_display = ("date", "user", "views", "videos_watched")
+    list_select_related = ("user",)
+    date_hierarchy = "date"
+    search_fields = ("user__username",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(VideoUpload)
+class VideoUploadAdmin(admin.ModelAdmin):
+    list_display = ("filename", "created_by", "offset", "size", "completed_at", "video", "updated_at")
+    list_select_related = ("created_by", "video")
+    readonly_fields = (
+        "filename",
+        "size",
+        "offset",
+        "created_by",
+        "video",
+        "completed_at",
+        "attached_at",
+        "created_at",
+        "updated_at",
+    )
 
     def has_add_permission(self, request):
         return False
@@ -0,0 +1,155 @@
+"""
+Daily rollups of video plays.
+
+Raw VideoView rows are summarised per video and per user and day into
+VideoDailyStat / UserDailyVideoStat; rows older than the retention window
+are then deleted. Reports read only the rollup tables.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from .models import UserDailyVideoStat, VideoDailyStat, VideoView
+
+DELETE_BATCH_SIZE = 5000
+
+
+def retention_days():
+    return getattr(settings, "VIDEO_VIEW_RETENTION_DAYS", 90)
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rollup_day(day):
+    """
+    (Re)build the rollup rows of one local day from the raw views.
+    """
+    views = VideoView.objects.filter(
+        viewed_at__gte=day_start(day),
+        viewed_at__lt=day_start(day + timedelta(days=1)),
+    ).order_by()
+
+    per_video = views.values("video_id").annotate(
+        views=Count("id"),
+        unique_viewers=Count("user_id", distinct=True),
+    )
+    per_user = views.filter(user__isnull=False).values("user_id").annotate(
+        views=Count("id"),
+        videos_watched=Count("video_id", distinct=True),
+    )
+
+    with transaction.atomic():
+        VideoDailyStat.objects.filter(date=day).delete()
+        UserDailyVideoStat.objects.filter(date=day).delete()
+
+        VideoDailyStat.objects.bulk_create(
+            [VideoDailyStat(date=day, **row) for row in per_video],
+            batch_size=500,
+        )
+        UserDailyVideoStat.objects.bulk_create(
+            [UserDailyVideoStat(date=day, **row) for row in per_user],
+            batch_size=500,
+        )
+
+
+def rollup_views(keep_days=None):
+    """
+    Roll up every day that may have changed since the last run, then prune
+    raw views older than `keep_days` (0 keeps everything).
+    Returns (days rolled up, raw rows deleted).
+    """
+    if keep_days is None:
+        keep_days = retention_days()
+
+    today = timezone.localdate()
+    cutoff = today - timedelta(days=keep_days) if keep_days else None
+
+    first = VideoView.objects.aggregate(first=Min("viewed_at"))["first"]
+    start = timezone.localtime(first).date() if first else today
+
+    # Days before the first raw view were pruned earlier; keep their rollups.
+    last = VideoDailyStat.objects.aggregate(last=Max("date"))["last"]
+    if last:
+        # The previous day again: buffered plays can arrive a little late.
+        start = max(start, last - timedelta(days=1))
+
+    day = start
+    days = 0
+    while day <= today:
+        rollup_day(day)
+        day += timedelta(days=1)
+        days += 1
+
+    deleted = prune_views(cutoff) if cutoff else 0
+    return days, deleted
+
+
+def prune_views(cutoff):
+    """
+    Delete raw views from before the `cutoff` day in small batches.
+    """
+    old = VideoView.objects.filter(viewed_at__lt=day_start(cutoff))
+    deleted = 0
+
+    while True:
+        pks = list(old.order_by().values_list("pk", flat=True)[:DELETE_BATCH_SIZE])
+        if not pks:
+            return deleted
+        deleted += VideoView.objects.filter(pk__in=pks).delete()[0]
+
+
+def views_report(date_from, date_to, video=None):
+    """
+    Daily totals and top videos between two dates (inclusive), from the
+    rollup tables only.
+    """
+    video_stats = VideoDailyStat.objects.filter(date__range=(date_from, date_to))
+    if video is not None:
+        video_stats = video_stats.filter(video=video)
+
+    views_by_day = dict(
+        video_stats.order_by().values("date").annotate(
+            total=Sum("views")
+        ).values_list("date", "total")
+    )
+
+    if video is not None:
+        viewers = video_stats.values_list("date", "unique_viewers")
+    else:
+        # Distinct students over all videos come from the per-user table
+        viewers = UserDailyVideoStat.objects.filter(
+            date__range=(date_from, date_to)
+        ).order_by().values("date").annotate(
+            total=Count("user_id")
+        ).values_list("date", "total")
+    viewers_by_day = dict(viewers)
+
+    days = []
+    day = date_from
+    while day <= date_to:
+        days.append(
+            {
+                "date": day,
+                "views": views_by_day.get(day, 0),
+                "viewers": viewers_by_day.get(day, 0),
+            }
+        )
+        day += timedelta(days=1)
+
+    top_videos = video_stats.order_by().values(
+        "video_id", "video__title", "video__slug"
+    ).annotate(
+        total=Sum("views")
+    ).order_by("-total")[:20]
+
+    return {
+        "days": days,
+        "total_views": sum(row["views"] for row in days),
+        "max_views": max((row["views"] for row in days), default=0),
+        "top_videos": list(top_videos),
+    }
@@ -4,3 +4,7 @@ class VideosConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "videos"
     verbose_name = "Videos"
+
+    def ready(self):
+        # Register signals (media files, search index, entitlements)
+        from . import signals  # noqa: F401
@@ -1,8 +1,12 @@
 from django import forms
-from .models import Video, VideoCategory, VideoPurchase
+from .models import Video, VideoCategory, VideoPurchase, VideoUpload
 
 
 class VideoForm(forms.ModelForm):
+    # Set by the chunked uploader in video_form.html instead of sending
+    # the file with the form.
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Video
         fields = (
@@ -15,6 +19,7 @@ class VideoForm(forms.ModelForm):
             "access_type",
             "price",
             "duration_minutes",
+            "lesson_order",
             "is_published",
             "is_featured",
         )
@@ -25,6 +30,27 @@ class VideoForm(forms.ModelForm):
             ),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+
+    def clean_upload_id(self):
+        upload_id = self.cleaned_data.get("upload_id")
+        if not upload_id:
+            return None
+
+        # Only the uploader's own uploads can be attached
+        upload = VideoUpload.objects.filter(
+            pk=upload_id,
+            created_by_id=getattr(self.user, "pk", None),
+            attached_at__isnull=True,
+        ).first()
+        if upload is None or not upload.is_complete:
+            raise forms.ValidationError(
+                "The video upload is not complete. Please upload the file again."
+            )
+        return upload
+
 
 class VideoCategoryForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from videos.models import Video
+from videos.processing import refresh_thumbnail_variants
+
+
+class Command(BaseCommand):
+    help = "Build resized thumbnail variants for videos that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild variants for every video with a thumbnail.",
+        )
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(thumbnail="").exclude(thumbnail__isnull=True)
+        if not options["all"]:
+            videos = videos.filter(thumbnail_variants={})
+
+        count = 0
+        for video in videos.iterator():
+            refresh_thumbnail_variants(video)
+            count += 1
+        self.stdout.write(f"Built thumbnail variants for {count} video(s).")
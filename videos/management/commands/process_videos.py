@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from videos import processing
+
+
+class Command(BaseCommand):
+    help = "Process queued video uploads (run as a long-lived worker service)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process everything currently queued, then exit.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=int,
+            default=10,
+            help="Seconds to wait when the queue is empty (default 10).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = processing.requeue_stale()
+            if requeued:
+                self.stdout.write(f"Re-queued {requeued} stale video(s).")
+
+            video = processing.claim_next_video()
+            if video is None:
+                if options["once"]:
+                    return
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Processing video {video.pk}: {video.title}")
+            if processing.process_video(video):
+                self.stdout.write(self.style.SUCCESS(f"Video {video.pk} ready."))
+            else:
+                self.stderr.write(f"Video {video.pk} failed; see processing_error.")
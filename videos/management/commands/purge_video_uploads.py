@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from videos.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete unfinished chunked video uploads that were abandoned."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=None,
+            help="Age in hours after which an unfinished upload is deleted (default VIDEO_UPLOAD_EXPIRY_HOURS).",
+        )
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads(options["hours"])
+        self.stdout.write(f"Deleted {count} abandoned upload(s).")
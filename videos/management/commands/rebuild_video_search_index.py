@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from videos.models import Video
+from videos.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the video catalog."
+
+    def handle(self, *args, **options):
+        count = rebuild_index(Video.objects.all())
+        self.stdout.write(f"Indexed {count} video(s).")
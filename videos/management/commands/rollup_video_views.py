@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from videos.analytics import retention_days, rollup_views
+
+
+class Command(BaseCommand):
+    help = "Summarise video plays into daily rollups and prune old raw views."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=None,
+            help=(
+                "Keep raw views for this many days "
+                "(default VIDEO_VIEW_RETENTION_DAYS, 0 = keep all)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        keep_days = options["retention_days"]
+        if keep_days is None:
+            keep_days = retention_days()
+
+        days, deleted = rollup_views(keep_days)
+        self.stdout.write(
+            f"Rolled up {days} day(s); deleted {deleted} raw view(s)."
+        )
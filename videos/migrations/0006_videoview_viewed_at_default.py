@@ -0,0 +1,19 @@
+# Generated by Django 5.0.10 on 2026-10-19 06:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_video_thumbnail_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videoview',
+            name='viewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_videoview_viewed_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyVideoStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('videos_watched', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='VideoDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('unique_viewers', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='videoview',
+            index=models.Index(fields=['viewed_at'], name='videoview_viewed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='userdailyvideostat',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_video_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='videodailystat',
+            name='video',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='videos.video'),
+        ),
+        migrations.AddIndex(
+            model_name='userdailyvideostat',
+            index=models.Index(fields=['date'], name='userdailyvideostat_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='userdailyvideostat',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_user_daily_video_stat'),
+        ),
+        migrations.AddIndex(
+            model_name='videodailystat',
+            index=models.Index(fields=['date'], name='videodailystat_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='videodailystat',
+            constraint=models.UniqueConstraint(fields=('video', 'date'), name='unique_video_daily_stat'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:00
+
+from django.db import migrations, models
+
+
+def number_existing_lessons(apps, schema_editor):
+    # Keep the previous navigation order: creation time within a category
+    Video = apps.get_model("videos", "Video")
+    videos = list(Video.objects.only("id", "category_id").order_by("category_id", "created_at", "id"))
+    position = {}
+    for video in videos:
+        position[video.category_id] = position.get(video.category_id, 0) + 1
+        video.lesson_order = position[video.category_id]
+    Video.objects.bulk_update(videos, ["lesson_order"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_video_view_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='lesson_order',
+            field=models.PositiveIntegerField(blank=True, default=0, help_text='Position of this lesson in its category. Leave empty to add it at the end.'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['category', 'is_published', 'lesson_order', 'id'], name='video_lesson_order_idx'),
+        ),
+        migrations.RunPython(number_existing_lessons, migrations.RunPython.noop),
+    ]
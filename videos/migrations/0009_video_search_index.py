@@ -0,0 +1,32 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:10
+
+from django.db import migrations
+
+from videos.search import index_document, video_index
+
+
+def create_search_index(apps, schema_editor):
+    video_index.create(schema_editor)
+
+    alias = schema_editor.connection.alias
+    if not video_index.supported(alias):
+        return
+
+    Video = apps.get_model("videos", "Video")
+    for video in Video.objects.using(alias).select_related("category").iterator():
+        video_index.update(video.pk, index_document(video), using=alias)
+
+
+def drop_search_index(apps, schema_editor):
+    video_index.drop(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_video_lesson_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:09
+
+import exam_site.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_videoupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='video',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, storage=exam_site.storage.media_storage, upload_to='videos/thumbnails/'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='video_file',
+            field=models.FileField(blank=True, null=True, storage=exam_site.storage.media_storage, upload_to='videos/files/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='storyboard_vtt',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
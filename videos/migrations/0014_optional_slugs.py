@@ -0,0 +1,23 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0013_video_storyboard_vtt'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='video',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=240, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='videocategory',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=140, unique=True),
+        ),
+    ]
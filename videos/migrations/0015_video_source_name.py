@@ -0,0 +1,18 @@
+# Generated by Django 5.0.10 on 2026-10-19 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_optional_slugs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.10 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0015_video_source_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoupload',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='videoupload',
+            name='sha256_state',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+    ]
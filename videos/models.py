@@ -1,14 +1,22 @@
+import os
+import uuid
 from decimal import Decimal
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
+
+from exam_site import entitlements
+from exam_site.slugs import save_with_unique_slug
+from exam_site.storage import media_storage
 
 
 class VideoCategory(models.Model):
     name = models.CharField(max_length=120, unique=True)
-    slug = models.SlugField(max_length=140, unique=True)
+    slug = models.SlugField(max_length=140, unique=True, blank=True)
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     sequence = models.PositiveIntegerField(default=10)
@@ -20,12 +28,26 @@ class VideoCategory(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        save_with_unique_slug(
+            self,
+            self.name,
+            lambda: super(VideoCategory, self).save(*args, **kwargs),
+            fallback="category",
+        )
+
 
 class Video(models.Model):
     class AccessType(models.TextChoices):
         FREE = "free", "Free"
         PAID = "paid", "Paid"
 
+    class ProcessingStatus(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        PROCESSING = "processing", "Processing"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+
     category = models.ForeignKey(
         VideoCategory,
         on_delete=models.PROTECT,
@@ -33,17 +55,20 @@ class Video(models.Model):
     )
 
     title = models.CharField(max_length=220)
-    slug = models.SlugField(max_length=240, unique=True)
+    slug = models.SlugField(max_length=240, unique=True, blank=True)
     description = models.TextField()
 
+    # Stored by content hash: re-uploads of the same file share one copy
     thumbnail = models.ImageField(
         upload_to="videos/thumbnails/",
+        storage=media_storage,
         blank=True,
         null=True,
     )
 
     video_file = models.FileField(
         upload_to="videos/files/",
+        storage=media_storage,
         blank=True,
         null=True
     )
@@ -61,21 +86,108 @@ class Video(models.Model):
         validators=[MinValueValidator(Decimal("0.00"))],
     )
 
-    duration_minutes = models.PositiveIntegerField(default=0)
+    duration_minutes = models.PositiveIntegerField(
+        default=0,
+        help_text="Filled in from the video file once it has been processed.",
+    )
+    lesson_order = models.PositiveIntegerField(
+        default=0,
+        blank=True,
+        help_text="Position of this lesson in its category. Leave empty to add it at the end.",
+    )
     is_published = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     published_at = models.DateTimeField(blank=True, null=True)
     views_count = models.PositiveIntegerField(default=0, editable=False)
 
+    processing_status = models.CharField(
+        max_length=12,
+        choices=ProcessingStatus.choices,
+        default=ProcessingStatus.READY,
+        editable=False,
+    )
+    processing_error = models.TextField(blank=True, editable=False)
+    processing_attempts = models.PositiveIntegerField(default=0, editable=False)
+    processing_started_at = models.DateTimeField(blank=True, null=True, editable=False)
+    processing_progress = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # Read from the upload with ffprobe by the processing worker
+    duration_seconds = models.FloatField(blank=True, null=True, editable=False)
+    video_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    video_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    video_codec = models.CharField(max_length=32, blank=True, editable=False)
+    audio_codec = models.CharField(max_length=32, blank=True, editable=False)
+    bit_rate = models.PositiveBigIntegerField(blank=True, null=True, editable=False)
+    file_size = models.PositiveBigIntegerField(blank=True, null=True, editable=False)
+
+    # Stored name of the upload video_file was transcoded from. Uploads
+    # with the same content reuse this video's output.
+    source_name = models.CharField(max_length=255, blank=True, editable=False)
+
+    # HLS master playlist, relative to MEDIA_ROOT (VIDEO_STREAMING_FORMAT="hls")
+    hls_playlist = models.CharField(max_length=255, blank=True, editable=False)
+
+    # Seek-preview WebVTT index next to its sprite sheets, relative to MEDIA_ROOT
+    storyboard_vtt = models.CharField(max_length=255, blank=True, editable=False)
+
+    # Resized thumbnails: {"webp": {"320": name, ...}, "jpeg": {...}}
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-is_featured", "-published_at", "-created_at")
+        indexes = [
+            # Previous/next lesson lookups in watch_video
+            models.Index(
+                fields=("category", "is_published", "lesson_order", "id"),
+                name="video_lesson_order_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self.lesson_order and self.category_id:
+            last = Video.objects.filter(category_id=self.category_id).exclude(
+                pk=self.pk
+            ).aggregate(last=models.Max("lesson_order"))["last"]
+            self.lesson_order = (last or 0) + 1
+        save_with_unique_slug(
+            self,
+            self.title,
+            lambda: super(Video, self).save(*args, **kwargs),
+            fallback="video",
+        )
+
+    def _lesson_neighbour(self, before):
+        """
+        Adjacent published lesson of the same category, by (lesson_order, id).
+        """
+        lessons = Video.objects.filter(
+            category_id=self.category_id,
+            is_published=True,
+        )
+        if before:
+            lessons = lessons.filter(
+                models.Q(lesson_order__lt=self.lesson_order)
+                | models.Q(lesson_order=self.lesson_order, id__lt=self.pk)
+            ).order_by("-lesson_order", "-id")
+        else:
+            lessons = lessons.filter(
+                models.Q(lesson_order__gt=self.lesson_order)
+                | models.Q(lesson_order=self.lesson_order, id__gt=self.pk)
+            ).order_by("lesson_order", "id")
+        return lessons.only("title", "slug").first()
+
+    def previous_lesson(self):
+        return self._lesson_neighbour(before=True)
+
+    def next_lesson(self):
+        return self._lesson_neighbour(before=False)
+
     def get_absolute_url(self):
         return reverse("videos:detail", kwargs={"slug": self.slug})
 
@@ -83,17 +195,66 @@ class Video(models.Model):
     def is_free(self):
         return self.access_type == self.AccessType.FREE
 
+    @property
+    def is_ready(self):
+        return self.processing_status == self.ProcessingStatus.READY
+
+    def _thumbnail_variant_urls(self, fmt):
+        variants = (self.thumbnail_variants or {}).get(fmt) or {}
+        return [
+            (int(width), default_storage.url(name))
+            for width, name in sorted(variants.items(), key=lambda item: int(item[0]))
+        ]
+
+    @property
+    def thumbnail_webp_srcset(self):
+        return ", ".join(f"{url} {width}w" for width, url in self._thumbnail_variant_urls("webp"))
+
+    @property
+    def thumbnail_jpeg_srcset(self):
+        return ", ".join(f"{url} {width}w" for width, url in self._thumbnail_variant_urls("jpeg"))
+
+    @property
+    def thumbnail_small_url(self):
+        urls = self._thumbnail_variant_urls("jpeg")
+        if urls:
+            return urls[0][1]
+        return self.thumbnail.url if self.thumbnail else ""
+
+    @property
+    def poster_url(self):
+        urls = self._thumbnail_variant_urls("jpeg")
+        if urls:
+            return urls[-1][1]
+        return self.thumbnail.url if self.thumbnail else ""
+
+    @property
+    def resolution(self):
+        if self.video_width and self.video_height:
+            return f"{self.video_width}x{self.video_height}"
+        return ""
+
+    @property
+    def bit_rate_kbps(self):
+        return round(self.bit_rate / 1000) if self.bit_rate else None
+
+    @property
+    def hls_url(self):
+        if not self.hls_playlist:
+            return ""
+        return reverse("videos:hls", kwargs={"slug": self.slug, "name": "master.m3u8"})
+
+    @property
+    def storyboard_url(self):
+        if not self.storyboard_vtt:
+            return ""
+        return reverse("videos:storyboard", kwargs={"slug": self.slug, "name": "storyboard.vtt"})
+
     def user_has_access(self, user):
         if self.is_free:
             return True
 
-        if not getattr(user, "is_authenticated", False):
-            return False
-
-        return self.purchases.filter(
-            user=user,
-            status=VideoPurchase.Status.APPROVED,
-        ).exists()
+        return self.pk in entitlements.for_user(user).video_ids
 
     def clean(self):
         if self.access_type == self.AccessType.PAID and self.price <= 0:
@@ -146,6 +307,53 @@ class VideoPurchase(models.Model):
         return f"{self.user} - {self.video} - {self.status}"
 
 
+class VideoUpload(models.Model):
+    """
+    A resumable upload of a video file, sent in chunks by the video form.
+    The partial file lives in VIDEO_UPLOAD_DIR until it is attached to a
+    Video.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="video_uploads",
+    )
+    video = models.ForeignKey(
+        Video,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="uploads",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+    attached_at = models.DateTimeField(blank=True, null=True)
+
+    # Running SHA-256 of the bytes received so far, and the final digest
+    # once complete, so attaching the file does not read it again
+    sha256_state = models.BinaryField(default=b"", blank=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
+
+    class Meta:
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def is_complete(self):
+        return self.completed_at is not None
+
+    @property
+    def path(self):
+        return os.path.join(settings.VIDEO_UPLOAD_DIR, f"{self.pk}.part")
+
+
 class VideoView(models.Model):
     video = models.ForeignKey(
         Video, on_delete=models.CASCADE, related_name="view_records"
@@ -157,7 +365,68 @@ class VideoView(models.Model):
         blank=True,
         related_name="video_views",
     )
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    # Set when the play happens, not when the view buffer is flushed
+    viewed_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ("-viewed_at",)
+        indexes = [
+            # Admin listing, daily rollups and pruning all range over viewed_at
+            models.Index(fields=("viewed_at",), name="videoview_viewed_at_idx"),
+        ]
+
+
+class VideoDailyStat(models.Model):
+    """
+    Plays of one video on one day, built from VideoView by
+    `manage.py rollup_video_views`.
+    """
+    video = models.ForeignKey(
+        Video, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    unique_viewers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("-date",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("video", "date"), name="unique_video_daily_stat"
+            )
+        ]
+        indexes = [
+            models.Index(fields=("date",), name="videodailystat_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.video} - {self.date}: {self.views}"
+
+
+class UserDailyVideoStat(models.Model):
+    """
+    Plays by one user on one day, built from VideoView by
+    `manage.py rollup_video_views`.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_video_stats",
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    videos_watched = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ("-date",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "date"), name="unique_user_daily_video_stat"
+            )
+        ]
+        indexes = [
+            models.Index(fields=("date",), name="userdailyvideostat_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.date}: {self.views}"
@@ -0,0 +1,328 @@
+"""
+Background video processing queue.
+
+Uploads are only marked as queued by the views; the `process_videos`
+management command (run as a long-lived service) claims queued videos one at
+a time and runs the ffmpeg work outside the web workers.
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from exam_site.storage import release_files
+
+from .models import Video
+from .storyboards import delete_storyboard, generate_storyboard
+from .thumbnails import build_thumbnail_variants, extract_poster_frame
+from .utils import (
+    delete_hls_ladder,
+    generate_hls_ladder,
+    optimize_video_for_streaming,
+    probe_video,
+)
+
+logger = logging.getLogger(__name__)
+
+Status = Video.ProcessingStatus
+
+METADATA_FIELDS = (
+    "duration_seconds",
+    "video_width",
+    "video_height",
+    "video_codec",
+    "audio_codec",
+    "bit_rate",
+    "file_size",
+)
+
+# Seconds between progress writes to the database
+PROGRESS_INTERVAL = 2
+
+
+def _max_attempts():
+    return getattr(settings, "VIDEO_PROCESSING_MAX_ATTEMPTS", 3)
+
+
+def _retry_delay():
+    return timedelta(seconds=getattr(settings, "VIDEO_PROCESSING_RETRY_DELAY", 5 * 60))
+
+
+def _stale_after():
+    return timedelta(seconds=getattr(settings, "VIDEO_PROCESSING_TIMEOUT", 6 * 60 * 60))
+
+
+def queue_video(video):
+    """
+    Mark a video for processing. Uses update() so the worker and the
+    staff edit form never overwrite each other's fields.
+    """
+    if not video.video_file:
+        return
+
+    Video.objects.filter(pk=video.pk).update(
+        processing_status=Status.QUEUED,
+        processing_error="",
+        processing_attempts=0,
+        processing_started_at=None,
+        processing_progress=0,
+        source_name="",
+    )
+    video.processing_status = Status.QUEUED
+    video.processing_error = ""
+    video.processing_attempts = 0
+    video.processing_started_at = None
+    video.source_name = ""
+
+
+def _release_shared_output(video, field, delete):
+    # Outputs live next to the content-addressed file, so videos with the
+    # same upload share them.
+    value = getattr(video, field)
+    if not value:
+        return
+    if not Video.objects.filter(**{field: value}).exclude(pk=video.pk).exists():
+        delete(video)
+
+
+def release_hls_ladder(video):
+    """
+    Delete the video's HLS ladder unless another video still uses it.
+    """
+    _release_shared_output(video, "hls_playlist", delete_hls_ladder)
+
+
+def release_storyboard(video):
+    _release_shared_output(video, "storyboard_vtt", delete_storyboard)
+
+
+def find_processed_twin(video):
+    """
+    Another ready video with the same stored file (or transcoded from
+    it), whose outputs can be reused instead of transcoding it again.
+    """
+    if not video.video_file:
+        return None
+    name = video.video_file.name
+    return Video.objects.filter(
+        Q(video_file=name) | Q(source_name=name),
+        processing_status=Status.READY,
+    ).exclude(pk=video.pk).order_by("pk").first()
+
+
+def reuse_twin_outputs(video, twin):
+    """
+    Field values copying the processed outputs of `twin`.
+    """
+    fields = {name: getattr(twin, name) for name in METADATA_FIELDS}
+    fields["duration_minutes"] = twin.duration_minutes
+    if twin.source_name:
+        fields["video_file"] = twin.video_file.name
+        fields["source_name"] = twin.source_name
+
+    hls = getattr(settings, "VIDEO_STREAMING_FORMAT", "mp4") == "hls"
+    if hls and twin.hls_playlist:
+        fields["hls_playlist"] = twin.hls_playlist
+    elif hls:
+        fields["hls_playlist"] = generate_hls_ladder(video)
+
+    if video.hls_playlist and video.hls_playlist != fields.get("hls_playlist"):
+        release_hls_ladder(video)
+
+    fields["storyboard_vtt"] = twin.storyboard_vtt
+    if not twin.storyboard_vtt:
+        video.duration_seconds = twin.duration_seconds
+        fields["storyboard_vtt"] = generate_storyboard(video)
+    if video.storyboard_vtt and video.storyboard_vtt != fields["storyboard_vtt"]:
+        release_storyboard(video)
+
+    if not video.thumbnail and twin.thumbnail:
+        video.thumbnail = twin.thumbnail.name
+        fields["thumbnail"] = twin.thumbnail.name
+    if fields.get("thumbnail") or not video.thumbnail_variants:
+        fields["thumbnail_variants"] = build_thumbnail_variants(video)
+
+    return fields
+
+
+def refresh_thumbnail_variants(video):
+    """
+    Rebuild the resized thumbnails after a thumbnail upload.
+    """
+    video.thumbnail_variants = build_thumbnail_variants(video)
+    Video.objects.filter(pk=video.pk).update(thumbnail_variants=video.thumbnail_variants)
+
+
+def requeue_stale():
+    """
+    Put back videos whose worker died mid-encode.
+    """
+    return Video.objects.filter(
+        processing_status=Status.PROCESSING,
+        processing_started_at__lt=timezone.now() - _stale_after(),
+    ).update(processing_status=Status.QUEUED)
+
+
+def claim_next_video():
+    """
+    Atomically move the oldest queued video to PROCESSING.
+    The conditional UPDATE makes this safe with several workers on
+    SQLite and PostgreSQL alike.
+    """
+    # processing_started_at is only set on videos that already had a run,
+    # which then wait VIDEO_PROCESSING_RETRY_DELAY before the next one.
+    candidates = Video.objects.filter(
+        Q(processing_started_at__isnull=True)
+        | Q(processing_started_at__lt=timezone.now() - _retry_delay()),
+        processing_status=Status.QUEUED,
+    ).order_by("updated_at").values_list("pk", flat=True)[:10]
+
+    for pk in candidates:
+        claimed = Video.objects.filter(
+            pk=pk,
+            processing_status=Status.QUEUED,
+        ).update(
+            processing_status=Status.PROCESSING,
+            processing_started_at=timezone.now(),
+            processing_progress=0,
+        )
+        if claimed:
+            return Video.objects.get(pk=pk)
+
+    return None
+
+
+def _this_run(video):
+    return Video.objects.filter(pk=video.pk, processing_status=Status.PROCESSING)
+
+
+def progress_reporter(video, start, end):
+    """
+    Return an on_progress(percent) callback that maps one ffmpeg run onto
+    the start..end part of the video's processing_progress.
+    """
+    state = {"value": start, "written_at": 0.0}
+
+    def report(percent):
+        value = int(start + (end - start) * percent / 100)
+        now = time.monotonic()
+        if value <= state["value"] or now - state["written_at"] < PROGRESS_INTERVAL:
+            return
+        state.update(value=value, written_at=now)
+        _this_run(video).update(processing_progress=value)
+
+    return report
+
+
+def read_metadata(video):
+    """
+    Probe the upload and store its metadata right away, so staff see it
+    while the video is still being encoded.
+    """
+    try:
+        metadata = probe_video(video.video_file.path)
+    except (OSError, RuntimeError, ValueError):
+        # Informational only; encoding works without it.
+        logger.warning("Could not probe video %s", video.pk, exc_info=True)
+        metadata = dict.fromkeys(METADATA_FIELDS)
+        metadata.update(video_codec="", audio_codec="")
+
+    if metadata["duration_seconds"]:
+        metadata["duration_minutes"] = max(1, math.ceil(metadata["duration_seconds"] / 60))
+
+    for name, value in metadata.items():
+        setattr(video, name, value)
+    _this_run(video).update(**metadata)
+    return metadata
+
+
+def run_processing_steps(video):
+    """
+    Run every processing step for a video.
+    Returns the Video field values to store once all steps succeed.
+    """
+    twin = find_processed_twin(video)
+    if twin is not None:
+        # Same upload as an already processed video: nothing to transcode
+        logger.info("Video %s reuses the processed file of video %s", video.pk, twin.pk)
+        return reuse_twin_outputs(video, twin)
+
+    fields = read_metadata(video)
+
+    hls = getattr(settings, "VIDEO_STREAMING_FORMAT", "mp4") == "hls"
+    if hls:
+        # Built from the original upload, before it is re-encoded below.
+        playlist = generate_hls_ladder(video, on_progress=progress_reporter(video, 0, 60))
+        if video.hls_playlist and video.hls_playlist != playlist:
+            release_hls_ladder(video)
+        fields["hls_playlist"] = playlist
+
+    if not video.thumbnail:
+        fields["thumbnail"] = extract_poster_frame(video)
+    if fields.get("thumbnail") or not video.thumbnail_variants:
+        fields["thumbnail_variants"] = build_thumbnail_variants(video)
+
+    storyboard = generate_storyboard(video)
+    if video.storyboard_vtt and video.storyboard_vtt != storyboard:
+        release_storyboard(video)
+    fields["storyboard_vtt"] = storyboard
+
+    # Single MP4 for browsers without HLS support and for plain mode
+    transcoded = optimize_video_for_streaming(
+        video,
+        on_progress=progress_reporter(video, 60 if hls else 0, 99),
+    )
+    if transcoded and transcoded != video.video_file.name:
+        fields["video_file"] = transcoded
+        fields["source_name"] = video.video_file.name
+
+    return fields
+
+
+def process_video(video):
+    """
+    Run the processing steps for one claimed video and record the outcome.
+    Failed videos are re-queued until VIDEO_PROCESSING_MAX_ATTEMPTS.
+    """
+    attempts = video.processing_attempts + 1
+    # Only record the outcome if nobody re-queued the video (e.g. a new
+    # upload) while it was being processed.
+    this_run = _this_run(video)
+
+    # The same stored file is being encoded for an older video: wait for
+    # it (retry delay, no attempt used) and then reuse its output.
+    if video.video_file and Video.objects.filter(
+        video_file=video.video_file.name,
+        processing_status=Status.PROCESSING,
+        pk__lt=video.pk,
+    ).exists():
+        this_run.update(processing_status=Status.QUEUED, processing_started_at=timezone.now())
+        return False
+
+    try:
+        fields = run_processing_steps(video)
+    except Exception as exc:
+        logger.exception("Processing video %s failed", video.pk)
+        status = Status.QUEUED if attempts < _max_attempts() else Status.FAILED
+        this_run.update(
+            processing_status=status,
+            processing_error=str(exc),
+            processing_attempts=attempts,
+        )
+        return False
+
+    stored = this_run.update(
+        processing_status=Status.READY,
+        processing_error="",
+        processing_attempts=attempts,
+        processing_progress=100,
+        **fields,
+    )
+    if fields.get("video_file"):
+        # Deleted only if no other video still uses it
+        release_files([video.video_file.name if stored else fields["video_file"]])
+    return True
@@ -0,0 +1,55 @@
+"""
+Catalog search: full-text index over video title, category name and
+description (see exam_site.fulltext).
+"""
+from django.db.models import Q
+
+from exam_site.fulltext import SearchIndex
+
+video_index = SearchIndex(
+    "videos_video_fts",
+    (("title", "A"), ("category", "B"), ("description", "C")),
+)
+
+
+def index_document(video):
+    return {
+        "title": video.title,
+        "category": video.category.name if video.category_id else "",
+        "description": video.description,
+    }
+
+
+def index_video(video, using="default"):
+    if video_index.supported(using):
+        video_index.update(video.pk, index_document(video), using=using)
+
+
+def remove_video(pk, using="default"):
+    video_index.remove(pk, using=using)
+
+
+def rebuild_index(videos, using="default"):
+    if not video_index.supported(using):
+        return 0
+
+    video_index.clear(using=using)
+    count = 0
+    for video in videos.select_related("category").iterator():
+        video_index.update(video.pk, index_document(video), using=using)
+        count += 1
+    return count
+
+
+def search_videos(queryset, q):
+    """
+    Videos of `queryset` matching `q`, most relevant first.
+    """
+    if video_index.supported(queryset.db):
+        return video_index.filter(queryset, q)
+
+    return queryset.filter(
+        Q(title__icontains=q)
+        | Q(description__icontains=q)
+        | Q(category__name__icontains=q)
+    )
@@ -0,0 +1,163 @@
+"""
+Serving protected media files.
+
+Views check entitlement first and then call serve_file(). Depending on
+settings.MEDIA_SENDFILE_BACKEND the transfer is handed to the front proxy:
+
+- "nginx":  X-Accel-Redirect to MEDIA_SENDFILE_PREFIX (an `internal` location)
+- "apache": X-Sendfile with the absolute path (mod_xsendfile)
+- "":       served by Django with HTTP Range / If-Range support
+
+Range responses from Django are capped at MEDIA_RANGE_MAX_BYTES, so a
+player seeking through a long video makes several short requests instead of
+holding one worker for the whole stream.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".mp4": "video/mp4",
+    ".vtt": "text/vtt",
+    ".webp": "image/webp",
+}
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _content_type(path):
+    ext = os.path.splitext(path)[1].lower()
+    return CONTENT_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _etag(stat):
+    return f'"{int(stat.st_mtime)}-{stat.st_size}"'
+
+
+def _parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single "bytes=" range,
+    None if there is no usable header, or False if it cannot be satisfied.
+    Multi-range requests are answered with the full file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        start = max(0, size - length)
+        end = size - 1
+    else:
+        start = int(first)
+        end = int(last) if last else size - 1
+        end = min(end, size - 1)
+
+    if start >= size or start > end:
+        return False
+
+    max_bytes = getattr(settings, "MEDIA_RANGE_MAX_BYTES", 0)
+    if max_bytes:
+        end = min(end, start + max_bytes - 1)
+
+    return start, end
+
+
+def _if_range_matches(request, etag, mtime):
+    value = request.headers.get("If-Range")
+    if not value:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag
+    since = parse_http_date_safe(value)
+    return since is not None and int(mtime) <= since
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            data = handle.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _offload(path):
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", "")
+
+    if backend == "nginx":
+        relative = os.path.relpath(path, settings.MEDIA_ROOT)
+        response = HttpResponse(content_type=_content_type(path))
+        response["X-Accel-Redirect"] = settings.MEDIA_SENDFILE_PREFIX + quote(relative.replace(os.sep, "/"))
+        return response
+
+    if backend == "apache":
+        response = HttpResponse(content_type=_content_type(path))
+        response["X-Sendfile"] = path
+        return response
+
+    return None
+
+
+def serve_file(request, path, cache_control="private, max-age=3600"):
+    """
+    Send the file at `path` (absolute, under MEDIA_ROOT) to an already
+    authorised user.
+    """
+    response = _offload(path)
+    if response is not None:
+        response["Cache-Control"] = cache_control
+        return response
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _etag(stat)
+    content_type = _content_type(path)
+
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified()
+
+    byte_range = None
+    if _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = _parse_range(request.headers.get("Range"), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _read_range(path, start, length),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Length"] = str(length)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = cache_control
+    return response
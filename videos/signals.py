@@ -0,0 +1,43 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from exam_site import entitlements
+from exam_site.storage import connect_reference_counting
+
+from .models import Video, VideoCategory, VideoPurchase
+from .processing import release_hls_ladder, release_storyboard
+from .search import index_video, remove_video
+from .thumbnails import delete_thumbnail_variants
+
+# Video files and thumbnails are shared between videos with the same upload
+connect_reference_counting(Video)
+
+
+@receiver(post_delete, sender=Video)
+def delete_video_outputs(sender, instance, **kwargs):
+    """Remove generated streaming files when a video is deleted."""
+    release_hls_ladder(instance)
+    release_storyboard(instance)
+    delete_thumbnail_variants(instance)
+    remove_video(instance.pk, using=kwargs.get("using", "default"))
+
+
+@receiver(post_save, sender=Video)
+def update_video_search_index(sender, instance, using, raw=False, **kwargs):
+    if not raw:
+        index_video(instance, using=using)
+
+
+@receiver(post_save, sender=VideoCategory)
+def update_category_search_index(sender, instance, using, created, raw=False, **kwargs):
+    # The category name is part of each video's search document
+    if raw or created:
+        return
+    for video in instance.videos.using(using).select_related("category"):
+        index_video(video, using=using)
+
+
+@receiver(post_save, sender=VideoPurchase)
+@receiver(post_delete, sender=VideoPurchase)
+def invalidate_video_entitlements(sender, instance, **kwargs):
+    entitlements.invalidate([instance.user_id])
@@ -0,0 +1,143 @@
+"""
+Seek-preview storyboards.
+
+One thumbnail every VIDEO_STORYBOARD_INTERVAL seconds is tiled into JPEG
+sprite sheets, with a WebVTT index mapping each time range to a tile:
+
+    00:00:10.000 --> 00:00:20.000
+    sprite_001.jpg#xywh=160,0,160,90
+
+The player loads the index once and shows previews from the cached sprites
+while the student scrubs, instead of fetching video segments.
+"""
+import math
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from PIL import Image
+
+from .utils import ffmpeg_binary, run_ffmpeg
+
+
+def storyboard_directory(video):
+    """
+    videos/files/<..>/storyboards/<file name without extension>/
+    """
+    input_path = video.video_file.path
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(os.path.dirname(input_path), "storyboards", name)
+
+
+def _timestamp(seconds):
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+def _write_vtt(path, sheets, duration, interval, columns, rows):
+    with Image.open(sheets[0]) as sheet:
+        tile_width = sheet.width // columns
+        tile_height = sheet.height // rows
+
+    per_sheet = columns * rows
+    count = min(math.ceil(duration / interval), len(sheets) * per_sheet)
+
+    lines = ["WEBVTT", ""]
+    for index in range(count):
+        start = index * interval
+        end = min(start + interval, duration)
+        sheet = os.path.basename(sheets[index // per_sheet])
+        position = index % per_sheet
+        x = (position % columns) * tile_width
+        y = (position // columns) * tile_height
+
+        lines += [
+            f"{_timestamp(start)} --> {_timestamp(end)}",
+            f"{sheet}#xywh={x},{y},{tile_width},{tile_height}",
+            "",
+        ]
+
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("\n".join(lines))
+
+
+def generate_storyboard(video):
+    """
+    Build the sprite sheets and WebVTT index for a probed video.
+    Returns the index path relative to MEDIA_ROOT ("" when disabled or the
+    duration is unknown).
+    """
+    interval = getattr(settings, "VIDEO_STORYBOARD_INTERVAL", 10)
+    if not video.video_file or not video.duration_seconds or not interval:
+        return ""
+
+    columns = settings.VIDEO_STORYBOARD_COLUMNS
+    rows = settings.VIDEO_STORYBOARD_ROWS
+    width = settings.VIDEO_STORYBOARD_TILE_WIDTH
+
+    output_dir = storyboard_directory(video)
+    parent = os.path.dirname(output_dir)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent)
+
+    try:
+        run_ffmpeg(
+            [
+                ffmpeg_binary(),
+                "-y",
+
+                # Decode keyframes only; much faster on long lessons
+                "-skip_frame",
+                "nokey",
+                "-i",
+                video.video_file.path,
+
+                "-vf",
+                f"fps=1/{interval},scale={width}:-2,tile={columns}x{rows}",
+                "-an",
+                "-q:v",
+                "5",
+                os.path.join(work_dir, "sprite_%03d.jpg"),
+            ],
+            "Storyboard generation failed",
+        )
+
+        sheets = sorted(
+            os.path.join(work_dir, name)
+            for name in os.listdir(work_dir)
+            if name.endswith(".jpg")
+        )
+        if not sheets:
+            return ""
+
+        _write_vtt(
+            os.path.join(work_dir, "storyboard.vtt"),
+            sheets,
+            video.duration_seconds,
+            interval,
+            columns,
+            rows,
+        )
+
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.replace(work_dir, output_dir)
+
+    finally:
+        if os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+
+    return os.path.relpath(
+        os.path.join(output_dir, "storyboard.vtt"),
+        settings.MEDIA_ROOT,
+    )
+
+
+def delete_storyboard(video):
+    if video.storyboard_vtt:
+        shutil.rmtree(
+            os.path.dirname(os.path.join(settings.MEDIA_ROOT, video.storyboard_vtt)),
+            ignore_errors=True,
+        )
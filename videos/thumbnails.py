@@ -0,0 +1,122 @@
+"""
+Video thumbnails.
+
+- extract_poster_frame(): picks a representative frame with ffmpeg when no
+  thumbnail was uploaded.
+- build_thumbnail_variants(): resizes the thumbnail with Pillow into a few
+  widths, as WebP plus a JPEG fallback, for `srcset` on catalog pages.
+"""
+import io
+import os
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .utils import ffmpeg_binary
+
+VARIANTS_DIR = "videos/thumbnails/variants"
+
+
+def extract_poster_frame(video):
+    """
+    Save a representative frame of the video as its thumbnail.
+    Returns the stored thumbnail name.
+    """
+    input_path = video.video_file.path
+    fd, frame_path = tempfile.mkstemp(suffix=".jpg")
+    os.close(fd)
+
+    try:
+        command = [
+            ffmpeg_binary(),
+            "-y",
+            "-i",
+            input_path,
+
+            # Most representative frame of the first batch, max 1280 wide
+            "-vf",
+            "thumbnail=120,scale='min(1280,iw)':-2",
+
+            "-frames:v",
+            "1",
+            "-q:v",
+            "3",
+            frame_path,
+        ]
+
+        try:
+            subprocess.run(
+                command,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        except subprocess.CalledProcessError as exc:
+            error_message = exc.stderr.decode(
+                "utf-8",
+                errors="ignore",
+            )
+            raise RuntimeError(
+                f"Thumbnail extraction failed: {error_message[-2000:]}"
+            ) from exc
+
+        name = os.path.splitext(os.path.basename(input_path))[0] + ".jpg"
+        with open(frame_path, "rb") as handle:
+            video.thumbnail.save(name, File(handle), save=False)
+
+        return video.thumbnail.name
+
+    finally:
+        if os.path.exists(frame_path):
+            os.remove(frame_path)
+
+
+def delete_thumbnail_variants(video):
+    for by_width in (video.thumbnail_variants or {}).values():
+        for name in by_width.values():
+            default_storage.delete(name)
+
+
+def build_thumbnail_variants(video):
+    """
+    Write resized copies of video.thumbnail and return the new
+    thumbnail_variants value: {"webp": {"320": name, ...}, "jpeg": {...}}.
+    """
+    if not video.thumbnail:
+        delete_thumbnail_variants(video)
+        return {}
+
+    with video.thumbnail.open("rb") as handle:
+        image = Image.open(handle)
+        image.load()
+
+    image = image.convert("RGB")
+    stem = os.path.splitext(os.path.basename(video.thumbnail.name))[0]
+
+    variants = {"webp": {}, "jpeg": {}}
+    for width in settings.VIDEO_THUMBNAIL_WIDTHS:
+        if width > image.width and variants["jpeg"]:
+            break
+
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+
+        for fmt, ext, options in (
+            ("webp", "webp", {"quality": 80, "method": 6}),
+            ("jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+        ):
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt.upper(), **options)
+            name = default_storage.save(
+                f"{VARIANTS_DIR}/{video.pk}-{stem}-{width}.{ext}",
+                ContentFile(buffer.getvalue()),
+            )
+            variants[fmt][str(width)] = name
+
+    delete_thumbnail_variants(video)
+    return variants
@@ -0,0 +1,194 @@
+"""
+Resumable chunked video uploads.
+
+The video form sends large files in chunks instead of one multipart POST
+(all endpoints are staff-only and answer JSON):
+
+    POST uploads/               {"filename": ..., "size": ...}
+                                -> {"id", "offset", "size", "complete", "chunk_size"}
+    GET  uploads/<id>/          -> same state, to resume after a reconnect
+    POST uploads/<id>/chunk/    raw bytes of one chunk, with headers
+                                Upload-Offset: <byte offset of the chunk>
+                                Upload-Checksum: sha256 <hex digest of the chunk>
+
+A chunk is appended only if it starts at the current offset (409 with the
+current state otherwise) and its checksum matches (400, nothing kept).
+Chunks are streamed to a file in VIDEO_UPLOAD_DIR and added to a running
+SHA-256 kept on the upload row; once complete the form is submitted with the
+upload id and the file is moved into the content-addressed media storage
+under that digest, without reading it again.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from exam_site.storage import ResumableSha256, release_files
+
+from .models import Video, VideoUpload
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def chunk_size():
+    return getattr(settings, "VIDEO_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+
+
+def upload_state(upload):
+    return {
+        "id": str(upload.pk),
+        "offset": upload.offset,
+        "size": upload.size,
+        "complete": upload.is_complete,
+        "chunk_size": chunk_size(),
+    }
+
+
+def create_upload(user, filename, size):
+    filename = os.path.basename(filename or "").strip()[:200]
+    if not filename:
+        raise UploadError("A file name is required.")
+
+    max_bytes = getattr(settings, "VIDEO_UPLOAD_MAX_BYTES", 0)
+    if size <= 0:
+        raise UploadError("The file is empty.")
+    if max_bytes and size > max_bytes:
+        raise UploadError("The file is too large.", status=413)
+
+    os.makedirs(settings.VIDEO_UPLOAD_DIR, exist_ok=True)
+    upload = VideoUpload.objects.create(
+        filename=filename,
+        size=size,
+        created_by=user,
+    )
+    open(upload.path, "wb").close()
+    return upload
+
+
+def _parse_checksum(header):
+    """
+    "sha256 <hex>" -> hex digest, or None when no checksum was sent.
+    """
+    if not header:
+        return None
+    algorithm, _, digest = header.strip().partition(" ")
+    if algorithm.lower() != "sha256" or not digest:
+        raise UploadError("Only sha256 checksums are supported.")
+    return digest.strip().lower()
+
+
+def append_chunk(upload, stream, offset, length, checksum_header=None):
+    """
+    Append `length` bytes read from `stream` at `offset`.
+    Returns the refreshed upload.
+    """
+    if upload.is_complete:
+        raise UploadError("The upload is already complete.", status=409)
+    if offset != upload.offset:
+        raise UploadError("The chunk does not start at the current offset.", status=409)
+    if length <= 0 or length > chunk_size():
+        raise UploadError("Invalid chunk size.", status=413)
+    if offset + length > upload.size:
+        raise UploadError("The chunk goes past the end of the file.")
+
+    expected = _parse_checksum(checksum_header)
+    digest = hashlib.sha256()
+    received = 0
+    # Only stored once the chunk is accepted
+    running = None
+    if ResumableSha256.available() and (offset == 0 or upload.sha256_state):
+        running = ResumableSha256(upload.sha256_state if offset else b"")
+
+    mode = "r+b" if os.path.exists(upload.path) else "wb"
+    with open(upload.path, mode) as handle:
+        # Drop whatever a previously interrupted chunk left behind
+        handle.seek(offset)
+        handle.truncate()
+
+        while received < length:
+            data = stream.read(min(READ_SIZE, length - received))
+            if not data:
+                break
+            handle.write(data)
+            digest.update(data)
+            if running is not None:
+                running.update(data)
+            received += len(data)
+
+        if received != length or (expected and digest.hexdigest() != expected):
+            handle.seek(offset)
+            handle.truncate()
+            if received != length:
+                raise UploadError("The chunk was incomplete.")
+            raise UploadError("Checksum mismatch.")
+
+    new_offset = offset + length
+    complete = new_offset == upload.size
+    now = timezone.now()
+    # Conditional on the old offset, so two racing requests cannot both
+    # advance the upload.
+    advanced = VideoUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=new_offset,
+        completed_at=now if complete else None,
+        updated_at=now,
+        sha256_state=running.state if running is not None else b"",
+        sha256=running.hexdigest() if running is not None and complete else "",
+    )
+    upload.refresh_from_db()
+    if not advanced:
+        raise UploadError("The chunk does not start at the current offset.", status=409)
+    return upload
+
+
+def attach_upload(upload, video):
+    """
+    Move a completed upload into media storage as video.video_file.
+    If the same file is already stored, the upload is discarded and the
+    video shares the stored copy.
+    """
+    field = video.video_file.field
+    name = field.storage.adopt(
+        upload.path,
+        field.generate_filename(video, upload.filename),
+        # Hashed while the chunks arrived; read here only without libcrypto
+        digest=upload.sha256 or None,
+    )
+
+    previous = video.video_file.name
+    Video.objects.filter(pk=video.pk).update(video_file=name)
+    video.video_file.name = name
+    if previous != name:
+        release_files([previous])
+
+    upload.video = video
+    upload.attached_at = timezone.now()
+    upload.save(update_fields=["video", "attached_at", "updated_at"])
+
+
+def purge_stale_uploads(hours=None):
+    """
+    Delete uploads that were never attached and have not changed for
+    `hours` (VIDEO_UPLOAD_EXPIRY_HOURS by default).
+    """
+    if hours is None:
+        hours = getattr(settings, "VIDEO_UPLOAD_EXPIRY_HOURS", 48)
+
+    stale = VideoUpload.objects.filter(
+        attached_at__isnull=True,
+        updated_at__lt=timezone.now() - timedelta(hours=hours),
+    )
+    count = 0
+    for upload in stale.iterator():
+        if os.path.exists(upload.path):
+            os.remove(upload.path)
+        upload.delete()
+        count += 1
+    return count
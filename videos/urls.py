@@ -9,9 +9,22 @@ urlpatterns = [
 
     # Staff management
     path("manage/", views.manage_videos, name="manage"),
+    path("manage/views-report/", views.views_report, name="views_report"),
     path("create/", views.create_video, name="create"),
     path("edit/<int:pk>/", views.edit_video, name="edit"),
     path("delete/<int:pk>/", views.delete_video, name="delete"),
+    path("uploads/", views.upload_create, name="upload_create"),
+    path("uploads/<uuid:upload_id>/", views.upload_status, name="upload_status"),
+    path(
+        "uploads/<uuid:upload_id>/chunk/",
+        views.upload_chunk,
+        name="upload_chunk",
+    ),
+    path(
+        "retry-processing/<int:pk>/",
+        views.retry_processing,
+        name="retry_processing",
+    ),
 
     # Categories
     path("categories/", views.category_list, name="categories"),
@@ -45,6 +58,13 @@ urlpatterns = [
     # Individual video
     path("<slug:slug>/", views.video_detail, name="detail"),
     path("<slug:slug>/watch/", views.watch_video, name="watch"),
+    path("<slug:slug>/stream/", views.stream_video, name="stream"),
+    path("<slug:slug>/hls/<path:name>", views.stream_hls, name="hls"),
+    path(
+        "<slug:slug>/storyboard/<path:name>",
+        views.stream_storyboard,
+        name="storyboard",
+    ),
 
     # Buy one particular paid video
     path(
@@ -1,9 +1,127 @@
+import json
 import os
+import re
+import shutil
 import subprocess
 import tempfile
 
+from django.conf import settings
 
-def optimize_video_for_streaming(video):
+
+def ffmpeg_binary():
+    return getattr(settings, "FFMPEG_BINARY", "/usr/bin/ffmpeg")
+
+
+def ffprobe_binary():
+    return getattr(settings, "FFPROBE_BINARY", "/usr/bin/ffprobe")
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def probe_video(input_path):
+    """
+    Read duration, resolution, codecs, bitrate and size of a media file
+    with ffprobe. Returns a dict of Video field values.
+    """
+    try:
+        result = subprocess.run(
+            [
+                ffprobe_binary(),
+                "-v", "error",
+                "-print_format", "json",
+                "-show_format",
+                "-show_streams",
+                input_path,
+            ],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except subprocess.CalledProcessError as exc:
+        error_message = exc.stderr.decode(
+            "utf-8",
+            errors="ignore",
+        )
+        raise RuntimeError(
+            f"ffprobe failed: {error_message[-2000:]}"
+        ) from exc
+
+    data = json.loads(result.stdout.decode("utf-8", errors="ignore") or "{}")
+    info = data.get("format") or {}
+    streams = data.get("streams") or []
+
+    # Skip embedded cover images, which ffprobe also reports as video
+    video_stream = next(
+        (
+            s for s in streams
+            if s.get("codec_type") == "video"
+            and not (s.get("disposition") or {}).get("attached_pic")
+        ),
+        {},
+    )
+    audio_stream = next(
+        (s for s in streams if s.get("codec_type") == "audio"),
+        {},
+    )
+
+    try:
+        duration = float(info.get("duration") or video_stream.get("duration") or 0)
+    except ValueError:
+        duration = 0
+
+    return {
+        "duration_seconds": duration or None,
+        "video_width": _int_or_none(video_stream.get("width")),
+        "video_height": _int_or_none(video_stream.get("height")),
+        "video_codec": video_stream.get("codec_name", "")[:32],
+        "audio_codec": audio_stream.get("codec_name", "")[:32],
+        "bit_rate": _int_or_none(info.get("bit_rate")),
+        "file_size": _int_or_none(info.get("size")),
+    }
+
+
+def run_ffmpeg(command, error_label, duration=None, on_progress=None):
+    """
+    Run an ffmpeg command. With a known `duration` (seconds), the
+    `-progress` output is turned into on_progress(percent) calls.
+    """
+    command = [command[0], "-hide_banner", "-progress", "pipe:1", "-nostats", *command[1:]]
+
+    # stderr goes to a file: a full pipe would block ffmpeg while we
+    # are reading its progress from stdout.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+
+        for raw_line in process.stdout:
+            key, _, value = raw_line.decode("utf-8", errors="ignore").strip().partition("=")
+            # out_time_ms is in microseconds as well (ffmpeg naming quirk)
+            if key not in ("out_time_us", "out_time_ms") or not (duration and on_progress):
+                continue
+            microseconds = _int_or_none(value)
+            if microseconds is not None and microseconds >= 0:
+                on_progress(min(100.0, microseconds / 10_000 / duration))
+
+        if process.wait() != 0:
+            stderr.seek(0)
+            error_message = stderr.read().decode(
+                "utf-8",
+                errors="ignore",
+            )
+            raise RuntimeError(
+                f"{error_label}: {error_message[-2000:]}"
+            )
+
+
+def optimize_video_for_streaming(video, on_progress=None):
     """
     Convert uploaded MP4 files to a web-friendly format.
 
@@ -14,16 +132,20 @@ def optimize_video_for_streaming(video):
     - Fast-start MP4 metadata
     - Maximum 1080p resolution
     - Compatible with desktop and mobile browsers
+
+    The stored upload may be shared with other videos, so it is never
+    overwritten: the output is adopted into storage as a new file. Returns
+    its name, or None if the upload was left as it is.
     """
 
     if not video.video_file:
-        return
+        return None
 
     input_path = video.video_file.path
 
     # For now, process MP4 uploads.
     if not input_path.lower().endswith(".mp4"):
-        return
+        return None
 
     directory = os.path.dirname(input_path)
 
@@ -35,7 +157,7 @@ def optimize_video_for_streaming(video):
 
     try:
         command = [
-            "/usr/bin/ffmpeg",
+            ffmpeg_binary(),
             "-y",
 
             # Input
@@ -83,27 +205,169 @@ def optimize_video_for_streaming(video):
             temp_path,
         ]
 
-        subprocess.run(
+        # Raises on failure, leaving the original video untouched
+        run_ffmpeg(
             command,
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
+            "Video optimization failed",
+            duration=video.duration_seconds,
+            on_progress=on_progress,
         )
 
-        # Replace original uploaded file only after FFmpeg succeeds
-        os.replace(temp_path, input_path)
+        # Stored under its own content name; the caller swaps video_file
+        field = video.video_file.field
+        return field.storage.adopt(
+            temp_path,
+            field.generate_filename(video, os.path.basename(input_path)),
+        )
 
-    except subprocess.CalledProcessError as exc:
-        # Do not destroy original video if FFmpeg fails.
-        error_message = exc.stderr.decode(
-            "utf-8",
-            errors="ignore",
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _source_info(input_path):
+    """
+    Read the video height and whether there is an audio stream from
+    `ffmpeg -i` output.
+    """
+    result = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-i", input_path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    output = result.stderr.decode("utf-8", errors="ignore")
+
+    height = None
+    match = re.search(r"Video:.*?\b(\d{2,5})x(\d{2,5})\b", output)
+    if match:
+        height = int(match.group(2))
+
+    return height, "Audio:" in output
+
+
+def hls_directory(video):
+    """
+    Folder that holds the HLS ladder, next to the source file:
+    videos/files/hls/<file name without extension>/
+    """
+    input_path = video.video_file.path
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(os.path.dirname(input_path), "hls", name)
+
+
+def generate_hls_ladder(video, on_progress=None):
+    """
+    Encode the uploaded video into an adaptive-bitrate HLS ladder.
+
+    Output (next to the source file):
+    - master.m3u8 listing every rendition
+    - <height>p/index.m3u8 + 6 second .ts segments per rendition
+
+    Renditions taller than the source are skipped. The ladder is written to
+    a temporary folder and moved into place only after FFmpeg succeeds, so a
+    half-written playlist is never served.
+
+    Returns the master playlist path relative to MEDIA_ROOT.
+    """
+
+    if not video.video_file:
+        return ""
+
+    input_path = video.video_file.path
+    if video.video_height:
+        # Already probed with ffprobe
+        source_height, has_audio = video.video_height, bool(video.audio_codec)
+    else:
+        source_height, has_audio = _source_info(input_path)
+
+    renditions = [
+        r for r in settings.VIDEO_HLS_RENDITIONS
+        if not source_height or r["height"] <= source_height
+    ] or settings.VIDEO_HLS_RENDITIONS[:1]
+
+    output_dir = hls_directory(video)
+    parent = os.path.dirname(output_dir)
+    os.makedirs(parent, exist_ok=True)
+    work_dir = tempfile.mkdtemp(dir=parent)
+
+    segment = settings.VIDEO_HLS_SEGMENT_SECONDS
+
+    split = "".join(f"[v{i}]" for i in range(len(renditions)))
+    filters = [f"[0:v]split={len(renditions)}{split}"]
+    for i, r in enumerate(renditions):
+        filters.append(f"[v{i}]scale=-2:{r['height']}[v{i}out]")
+
+    command = [
+        ffmpeg_binary(),
+        "-y",
+        "-i",
+        input_path,
+        "-filter_complex",
+        ";".join(filters),
+    ]
+
+    stream_map = []
+    for i, r in enumerate(renditions):
+        command += [
+            "-map", f"[v{i}out]",
+            f"-c:v:{i}", "libx264",
+            f"-b:v:{i}", r["video_bitrate"],
+            f"-maxrate:v:{i}", r["video_bitrate"],
+            f"-bufsize:v:{i}", r["video_bitrate"],
+        ]
+        if has_audio:
+            command += [
+                "-map", "0:a:0",
+                f"-c:a:{i}", "aac",
+                f"-b:a:{i}", r["audio_bitrate"],
+            ]
+            stream_map.append(f"v:{i},a:{i},name:{r['height']}p")
+        else:
+            stream_map.append(f"v:{i},name:{r['height']}p")
+
+    command += [
+        "-preset", "fast",
+        "-pix_fmt", "yuv420p",
+
+        # Keyframe at every segment boundary so all renditions switch cleanly
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment})",
+        "-sc_threshold", "0",
+
+        "-f", "hls",
+        "-hls_time", str(segment),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(work_dir, "%v", "seg_%05d.ts"),
+        "-master_pl_name", "master.m3u8",
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(work_dir, "%v", "index.m3u8"),
+    ]
+
+    try:
+        run_ffmpeg(
+            command,
+            "HLS generation failed",
+            duration=video.duration_seconds,
+            on_progress=on_progress,
         )
 
-        raise RuntimeError(
-            f"Video optimization failed: {error_message[-2000:]}"
-        ) from exc
+        # Swap the finished ladder in place of any previous one.
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        os.replace(work_dir, output_dir)
 
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
\ No newline at end of file
+        if os.path.exists(work_dir):
+            shutil.rmtree(work_dir)
+
+    return os.path.relpath(
+        os.path.join(output_dir, "master.m3u8"),
+        settings.MEDIA_ROOT,
+    )
+
+
+def delete_hls_ladder(video):
+    if video.hls_playlist:
+        shutil.rmtree(
+            os.path.dirname(os.path.join(settings.MEDIA_ROOT, video.hls_playlist)),
+            ignore_errors=True,
+        )
@@ -0,0 +1,143 @@
+"""
+In-process buffer for video plays.
+
+watch_video only appends to a list. The list is written as one bulk insert of
+VideoView rows plus one views_count UPDATE per video when it reaches
+VIDEO_VIEW_BUFFER_SIZE events, VIDEO_VIEW_FLUSH_SECONDS after the first
+buffered event, and when the worker process exits.
+
+Displayed counts are therefore eventually consistent. A failed write keeps
+the plays for the next flush, but plays still in memory are lost if the
+worker is killed without exiting cleanly (SIGKILL, OOM killer, timeout):
+at most one buffer per worker.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Video, VideoView
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pending = []
+_timer = None
+
+
+def _buffer_size():
+    return getattr(settings, "VIDEO_VIEW_BUFFER_SIZE", 100)
+
+
+def _flush_seconds():
+    return getattr(settings, "VIDEO_VIEW_FLUSH_SECONDS", 30)
+
+
+def record_view(video, user):
+    """
+    Buffer one play of `video` by `user`.
+    """
+    global _timer
+
+    with _lock:
+        _pending.append((video.pk, getattr(user, "pk", None), timezone.now()))
+        full = len(_pending) >= _buffer_size()
+
+        if not full and _timer is None:
+            _timer = threading.Timer(_flush_seconds(), _flush_from_timer)
+            _timer.daemon = True
+            _timer.start()
+
+    if full:
+        _safe_flush()
+
+
+def pending_views(video_id):
+    """
+    Plays of this video recorded by this process but not yet written.
+    """
+    with _lock:
+        return sum(1 for event in _pending if event[0] == video_id)
+
+
+def flush():
+    """
+    Write buffered plays. Returns the number of plays written.
+    """
+    global _timer
+
+    with _lock:
+        events = _pending[:]
+        _pending.clear()
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+
+    if not events:
+        return 0
+
+    try:
+        with transaction.atomic():
+            # A video or user deleted since the play would fail the insert
+            # on every retry: such plays are dropped or made anonymous.
+            video_ids = set(
+                Video.objects.filter(pk__in={e[0] for e in events}).values_list("pk", flat=True)
+            )
+            user_ids = set(
+                get_user_model().objects.filter(
+                    pk__in={e[1] for e in events if e[1] is not None}
+                ).values_list("pk", flat=True)
+            )
+            plays = [
+                (video_id, user_id if user_id in user_ids else None, viewed_at)
+                for video_id, user_id, viewed_at in events
+                if video_id in video_ids
+            ]
+
+            VideoView.objects.bulk_create(
+                [
+                    VideoView(video_id=video_id, user_id=user_id, viewed_at=viewed_at)
+                    for video_id, user_id, viewed_at in plays
+                ],
+                batch_size=500,
+            )
+            for video_id, count in Counter(e[0] for e in plays).items():
+                Video.objects.filter(pk=video_id).update(
+                    views_count=F("views_count") + count
+                )
+    except Exception:
+        # Keep the plays for the next flush.
+        with _lock:
+            _pending[:0] = events
+        raise
+
+    return len(plays)
+
+
+def _safe_flush():
+    # Called from requests and the timer: a database error must not fail
+    # the page view, and flush() has already put the plays back.
+    try:
+        flush()
+    except Exception:
+        logger.exception("Writing buffered video plays failed")
+
+
+def _flush_from_timer():
+    global _timer
+
+    with _lock:
+        _timer = None
+    try:
+        _safe_flush()
+    finally:
+        connections.close_all()
+
+
+atexit.register(_safe_flush)
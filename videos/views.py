@@ -1,12 +1,27 @@
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db.models import F, Q
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
-from .utils import optimize_video_for_streaming
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_POST
+
+from exam_site import entitlements
+
+from . import analytics, uploads, view_buffer
+from .processing import queue_video, refresh_thumbnail_variants
+from .search import search_videos
+from .serving import serve_file
 
 from .forms import VideoCategoryForm, VideoForm, VideoPurchaseRequestForm
-from .models import Video, VideoCategory, VideoPurchase, VideoView
+from .models import Video, VideoCategory, VideoPurchase, VideoUpload
 
 
 def staff_required(view_func):
@@ -26,11 +41,8 @@ def video_list(request):
     if access in {Video.AccessType.FREE, Video.AccessType.PAID}:
         videos = videos.filter(access_type=access)
     if q:
-        videos = videos.filter(
-            Q(title__icontains=q)
-            | Q(description__icontains=q)
-            | Q(category__name__icontains=q)
-        )
+        # Ranked by relevance instead of the catalog order
+        videos = search_videos(videos, q)
 
     return render(
         request,
@@ -38,6 +50,7 @@ def video_list(request):
         {
             "videos": videos,
             "categories": categories,
+            "owned_video_ids": entitlements.for_user(request.user).video_ids,
             "selected_category": category_slug,
             "selected_access": access,
             "q": q,
@@ -47,22 +60,74 @@ def video_list(request):
 
 @staff_required
 def manage_videos(request):
-    videos = Video.objects.select_related("category").all()
-    return render(request, "videos/manage_videos.html", {"videos": videos})
+    videos = list(Video.objects.select_related("category").all())
+    processing_active = any(
+        video.processing_status in {Video.ProcessingStatus.QUEUED, Video.ProcessingStatus.PROCESSING}
+        for video in videos
+    )
+    return render(
+        request,
+        "videos/manage_videos.html",
+        {"videos": videos, "processing_active": processing_active},
+    )
+
+
+@staff_required
+def views_report(request):
+    today = timezone.localdate()
+    date_to = parse_date(request.GET.get("to") or "") or today
+    date_from = parse_date(request.GET.get("from") or "") or date_to - timedelta(days=29)
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    # Keep the day-by-day table to about a year
+    date_from = max(date_from, date_to - timedelta(days=365))
+
+    video = None
+    selected_video = request.GET.get("video", "").strip()
+    if selected_video:
+        video = get_object_or_404(Video, slug=selected_video)
+
+    report = analytics.views_report(date_from, date_to, video=video)
+
+    return render(
+        request,
+        "videos/views_report.html",
+        {
+            "report": report,
+            "date_from": date_from,
+            "date_to": date_to,
+            "video": video,
+            "videos": Video.objects.only("title", "slug").order_by("title"),
+        },
+    )
+
+
+def _attach_form_upload(form, video):
+    upload = form.cleaned_data.get("upload_id")
+    if upload is None:
+        return False
+    uploads.attach_upload(upload, video)
+    return True
 
 
 @staff_required
 def create_video(request):
     if request.method == "POST":
-        form = VideoForm(request.POST, request.FILES)
+        form = VideoForm(request.POST, request.FILES, user=request.user)
         if form.is_valid():
             video = form.save(commit=False)
             if video.is_published and not video.published_at:
                 video.published_at = timezone.now()
             video.save()
 
-            if "video_file" in request.FILES:
-                optimize_video_for_streaming(video)
+            if "thumbnail" in form.changed_data:
+                refresh_thumbnail_variants(video)
+            if _attach_form_upload(form, video) or "video_file" in request.FILES:
+                queue_video(video)
+                messages.info(
+                    request,
+                    "The video file is being processed and can be watched once it is ready.",
+                )
             messages.success(request, "Video created successfully.")
             return redirect("videos:manage")
     else:
@@ -78,15 +143,21 @@ def create_video(request):
 def edit_video(request, pk):
     video = get_object_or_404(Video, pk=pk)
     if request.method == "POST":
-        form = VideoForm(request.POST, request.FILES, instance=video)
+        form = VideoForm(request.POST, request.FILES, instance=video, user=request.user)
         if form.is_valid():
             video = form.save(commit=False)
             if video.is_published and not video.published_at:
                 video.published_at = timezone.now()
             video.save()
 
-            if "video_file" in request.FILES:
-                optimize_video_for_streaming(video)
+            if "thumbnail" in form.changed_data:
+                refresh_thumbnail_variants(video)
+            if _attach_form_upload(form, video) or "video_file" in request.FILES:
+                queue_video(video)
+                messages.info(
+                    request,
+                    "The video file is being processed and can be watched once it is ready.",
+                )
             messages.success(request, "Video updated successfully.")
             return redirect("videos:manage")
     else:
@@ -98,6 +169,87 @@ def edit_video(request, pk):
         {"form": form, "page_title": "Edit Video", "video": video},
     )
 
+@staff_required
+@require_POST
+def upload_create(request):
+    try:
+        data = json.loads(request.body or b"{}")
+        filename = str(data.get("filename", ""))
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "Invalid upload request."}, status=400)
+
+    try:
+        upload = uploads.create_upload(request.user, filename, size)
+    except uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=exc.status)
+
+    return JsonResponse(uploads.upload_state(upload), status=201)
+
+
+def _get_open_upload(request, upload_id):
+    return get_object_or_404(
+        VideoUpload,
+        pk=upload_id,
+        created_by=request.user,
+        attached_at__isnull=True,
+    )
+
+
+@staff_required
+def upload_status(request, upload_id):
+    upload = _get_open_upload(request, upload_id)
+    return JsonResponse(uploads.upload_state(upload))
+
+
+@staff_required
+@require_POST
+def upload_chunk(request, upload_id):
+    upload = _get_open_upload(request, upload_id)
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return JsonResponse({"error": "Upload-Offset is required."}, status=400)
+
+    try:
+        # Read from the request stream, never into memory as request.body
+        upload = uploads.append_chunk(
+            upload,
+            request,
+            offset,
+            length,
+            request.headers.get("Upload-Checksum"),
+        )
+    except uploads.UploadError as exc:
+        upload.refresh_from_db()
+        return JsonResponse(
+            {"error": str(exc), **uploads.upload_state(upload)},
+            status=exc.status,
+        )
+
+    return JsonResponse(uploads.upload_state(upload))
+
+
+@staff_required
+@require_POST
+def retry_processing(request, pk):
+    video = get_object_or_404(Video, pk=pk)
+    # Processing again would re-encode the transcoded file and take a
+    # ready video offline while it runs.
+    if video.processing_status != Video.ProcessingStatus.FAILED:
+        messages.error(
+            request,
+            f'Only failed videos can be retried; "{video.title}" is '
+            f"{video.get_processing_status_display().lower()}.",
+        )
+        return redirect("videos:manage")
+    queue_video(video)
+    messages.success(request, f'"{video.title}" was queued for processing again.')
+    return redirect("videos:manage")
+
+
 @staff_required
 def delete_video(request, pk):
     video = get_object_or_404(Video, pk=pk)
@@ -201,41 +353,23 @@ def watch_video(request, slug):
             slug=video.slug
         )
 
-    VideoView.objects.create(
-        video=video,
-        user=request.user
-    )
-
-    Video.objects.filter(
-        pk=video.pk
-    ).update(
-        views_count=F("views_count") + 1
-    )
-
-    video.refresh_from_db(
-        fields=["views_count"]
-    )
-
-    published_videos = list(
-        Video.objects.filter(
-            is_published=True,
-            category=video.category
-        ).order_by("created_at")
-    )
-
-    previous_video = None
-    next_video = None
-
-    for index, item in enumerate(published_videos):
-        if item.pk == video.pk:
-
-            if index > 0:
-                previous_video = published_videos[index - 1]
+    if not video.is_ready:
+        messages.info(
+            request,
+            "This video is still being processed. Please try again later."
+        )
+        return redirect(
+            "videos:detail",
+            slug=video.slug
+        )
 
-            if index < len(published_videos) - 1:
-                next_video = published_videos[index + 1]
+    # Written in batches; the shown count includes this process's
+    # not-yet-flushed plays.
+    view_buffer.record_view(video, request.user)
+    video.views_count += view_buffer.pending_views(video.pk)
 
-            break
+    previous_video = video.previous_lesson()
+    next_video = video.next_lesson()
 
     return render(
         request,
@@ -248,6 +382,68 @@ def watch_video(request, slug):
     )
 
 
+def _get_streamable_video(request, slug):
+    video = get_object_or_404(Video, slug=slug, is_published=True)
+    if not video.is_ready or not video.user_has_access(request.user):
+        raise Http404("Video not available.")
+    return video
+
+
+@login_required
+def stream_video(request, slug):
+    video = _get_streamable_video(request, slug)
+    if not video.video_file:
+        raise Http404("Video has no file.")
+    return serve_file(request, video.video_file.path)
+
+
+def _serve_output_file(request, index_file, name, **kwargs):
+    """
+    Serve `name` from the folder of a generated output (HLS ladder,
+    storyboard) whose index file is `index_file`, relative to MEDIA_ROOT.
+    """
+    root = os.path.dirname(os.path.join(settings.MEDIA_ROOT, index_file))
+    try:
+        # Rejects names that resolve outside `root`
+        path = FileSystemStorage(location=root).path(name)
+    except SuspiciousFileOperation:
+        raise Http404("Invalid path.")
+
+    if not os.path.isfile(path):
+        raise Http404("File not found.")
+
+    return serve_file(request, path, **kwargs)
+
+
+@login_required
+def stream_hls(request, slug, name):
+    video = _get_streamable_video(request, slug)
+    if not video.hls_playlist:
+        raise Http404("Video has no HLS playlist.")
+
+    # Segments never change once written; playlists are re-read often
+    if name.endswith(".m3u8"):
+        cache_control = "private, max-age=60"
+    else:
+        cache_control = "private, max-age=31536000, immutable"
+    return _serve_output_file(request, video.hls_playlist, name, cache_control=cache_control)
+
+
+@login_required
+def stream_storyboard(request, slug, name):
+    video = _get_streamable_video(request, slug)
+    if not video.storyboard_vtt:
+        raise Http404("Video has no storyboard.")
+
+    # One sprite sheet covers many minutes; let the browser keep it.
+    return _serve_output_file(
+        request,
+        video.storyboard_vtt,
+        name,
+        cache_control="private, max-age=86400",
+    )
+
+
 @login_required
 def request_purchase(request, slug):
     video = get_object_or_404(